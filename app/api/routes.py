@@ -13,18 +13,16 @@ from app.schemas.models import (
     DocumentUploadResponse,
 )
 from app.utils.helpers import setup_logging
-from app.services.upload_service import UploadService
-from app.services.query_service import QueryService
-from app.embedding.embedding_service import EmbeddingService
+from app.services.dependencies import (
+    get_upload_service,
+    get_query_service,
+    get_embedding_service,
+    get_vector_store,
+)
 
 router = APIRouter()
 logger = setup_logging(__name__)
 
-# Initialize services
-upload_service = UploadService()
-query_service = QueryService()
-embedding_service = EmbeddingService()
-
 
 @router.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(file: UploadFile = File(...)):
@@ -38,11 +36,12 @@ async def upload_document(file: UploadFile = File(...)):
         DocumentUploadResponse with document metadata and chunk count
     """
     try:
-        result = await upload_service.process_upload(file)
+        result = await get_upload_service().process_upload(file)
         
         return DocumentUploadResponse(
             success=result.get("success", True),
             document_id=result.get("document_id"),
+            upload_id=result.get("upload_id"),
             document_name=result.get("document_name"),
             storage_path=result.get("storage_path"),
             pdf_type=result.get("pdf_type"),
@@ -72,7 +71,7 @@ async def query_rag(request: QueryRequest):
         from datetime import datetime
         
         # Use session_id if provided for conversation history
-        result = await query_service.process_query_with_history(
+        result = await get_query_service().process_query_with_history(
             request.query,
             session_id=request.session_id
         )
@@ -165,15 +164,12 @@ async def list_chat_sessions():
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    from app.embedding.embedding_service import VectorStore
-    
     # Check if embedding service is initialized
-    embedding_ok = embedding_service.client is not None
+    embedding_ok = get_embedding_service().client is not None
     
     # Check if vector store is initialized
     try:
-        vector_store = VectorStore()
-        vector_store_ok = vector_store.client is not None
+        vector_store_ok = get_vector_store().client is not None
     except:
         vector_store_ok = False
     
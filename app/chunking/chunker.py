@@ -39,7 +39,9 @@ class Chunk:
             extraction_type: Type of extraction (text or OCR)
         """
         self.chunk_id = chunk_id
-        self.text = text
+        self.text = text if isinstance(text, str) else str(text or "")
+        # Evidence preview, computed once here instead of on every query that retrieves the chunk
+        self.text_preview = self.text[:settings.max_metadata_length]
         self.page_number = page_number
         self.chunk_index = chunk_index
         self.bbox = bbox
@@ -52,6 +54,7 @@ class Chunk:
         return {
             "chunk_id": self.chunk_id,
             "text": self.text,
+            "text_preview": self.text_preview,
             "page_number": self.page_number,
             "chunk_index": self.chunk_index,
             "bbox": self.bbox,
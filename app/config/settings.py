@@ -3,8 +3,16 @@ Application Configuration Settings
 Centralized configuration management using pydantic-settings
 """
 
+from functools import cached_property, lru_cache
+from pathlib import Path
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import NamedTuple, Optional
+
+
+class TesseractLocation(NamedTuple):
+    """Resolved Tesseract executable path and its directory"""
+    path: str
+    parent: str
 
 
 class Settings(BaseSettings):
@@ -21,6 +29,8 @@ class Settings(BaseSettings):
     vector_db_type: str = "chroma"
     vector_db_url: Optional[str] = None
     vector_db_path: str = "./storage/chroma_db"
+    chroma_server_host: Optional[str] = None
+    chroma_server_port: int = 8000
     
     # LLM Configuration
     llm_provider: str = "openai"
@@ -33,6 +43,8 @@ class Settings(BaseSettings):
     embedding_model: str = "text-embedding-3-small"
     embedding_api_key: Optional[str] = None
     embedding_dimension: int = 1536
+    embedding_cache_enabled: bool = False
+    embedding_cache_path: str = "./storage/embedding_cache.sqlite3"
     
     # PDF Processing
     ocr_provider: str = "tesseract"
@@ -48,9 +60,17 @@ class Settings(BaseSettings):
     rerank_model: str = "cross-encoder/mmarco-MiniLMv2-L12-H384-v1"
     similarity_threshold: float = 0.5
     
+    # Query Batching (coalesce concurrent queries for embedding and reranking)
+    query_batching_enabled: bool = False
+    query_batch_max_size: int = 16
+    query_batch_max_wait_ms: int = 50
+    
     # Verification
     verification_enabled: bool = True
     confidence_threshold: float = 0.7
+    verification_cache_enabled: bool = True
+    verification_cache_size: int = 512
+    verification_cache_ttl: int = 3600
     
     # Storage
     storage_path: str = "./storage"
@@ -61,6 +81,14 @@ class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379/0"
     cache_ttl: int = 3600
     
+    @cached_property
+    def resolved_tesseract(self) -> Optional[TesseractLocation]:
+        """Tesseract location resolved once per process (None if not configured)"""
+        if not self.tesseract_path:
+            return None
+        path = Path(self.tesseract_path).resolve(strict=False)
+        return TesseractLocation(path=str(path), parent=str(path.parent))
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -68,4 +96,10 @@ class Settings(BaseSettings):
         extra = "ignore"  # Allow extra fields from .env
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings parsed from the environment and .env once per process"""
+    return Settings()
+
+
+settings = get_settings()
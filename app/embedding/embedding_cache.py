@@ -0,0 +1,68 @@
+"""
+Embedding Disk Cache
+Persists embeddings keyed by SHA-256 of model and text, so repeated texts
+(re-uploaded documents, test reruns) skip the embeddings API
+"""
+
+from pathlib import Path
+from typing import Dict, List
+import hashlib
+import logging
+import sqlite3
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingDiskCache:
+    """SQLite-backed store of float32 embedding vectors"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite database file
+        """
+        db_path = Path(path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by worker threads, serialized by the lock;
+        # WAL lets several processes read while one writes
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        logger.info(f"[EMBED CACHE] Using embedding disk cache at {db_path}")
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """Cache key for a text embedded with a model"""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the keys that are present"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors by key"""
+        rows = [
+            (key, np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            for key, vector in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
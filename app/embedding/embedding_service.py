@@ -5,11 +5,16 @@ Uses OpenAI's embedding API for consistency with LLM
 """
 
 from typing import List, Dict, Tuple, Optional
+import asyncio
 import logging
+import base64
 import numpy as np
 import os
 import hashlib
 import json
+import re
+
+from cachetools import TTLCache
 
 try:
     from openai import OpenAI
@@ -23,9 +28,32 @@ except ImportError:
     chromadb = None
 
 from app.config.settings import settings
+from app.embedding.embedding_cache import EmbeddingDiskCache
 
 logger = logging.getLogger(__name__)
 
+# Chunk IDs are "<document_id>_p<page>_c<index>" (see TextChunker)
+_CHUNK_ID_RE = re.compile(r"^(.*)_p\d+_c\d+$")
+
+# Backend names for which the collection is a ChromaDB collection
+CHROMA_BACKENDS = ("chroma", "chroma_ephemeral", "chroma_persistent", "chroma_http")
+
+# Seconds a collection count is reused before asking Chroma again
+COUNT_CACHE_TTL = 5
+
+# Texts per embeddings API request, and how many requests one embed_texts call runs at once
+EMBED_REQUEST_SIZE = 1000
+EMBED_REQUEST_CONCURRENCY = 16
+
+
+def _decode_embedding(embedding) -> np.ndarray:
+    """float32 vector from an embeddings API item requested as base64"""
+    if isinstance(embedding, str):
+        # Little-endian float32 bytes, so no JSON float parsing
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4").astype(np.float32, copy=False)
+    # SDK versions that decode base64 themselves hand back floats
+    return np.asarray(embedding, dtype=np.float32)
+
 
 class EmbeddingService:
     """Generates embeddings using OpenAI API"""
@@ -41,6 +69,13 @@ class EmbeddingService:
         self.model_name = model_name or settings.embedding_model
         self.embedding_dimension = settings.embedding_dimension
         self.api_key = api_key or settings.llm_api_key
+        self.disk_cache = None
+        
+        if settings.embedding_cache_enabled:
+            try:
+                self.disk_cache = EmbeddingDiskCache(settings.embedding_cache_path)
+            except Exception as e:
+                logger.warning(f"⚠️  Embedding disk cache unavailable: {str(e)}")
         
         try:
             logger.info(f"Initializing OpenAI Embedding Service")
@@ -112,12 +147,15 @@ class EmbeddingService:
             
             logger.debug(f"Embedding text with OpenAI: {text[:100]}...")
             
-            response = self.client.embeddings.create(
+            # Run the blocking SDK call in a worker thread so the event loop stays free
+            response = await asyncio.to_thread(
+                self.client.embeddings.create,
                 input=text,
-                model=self.model_name
+                model=self.model_name,
+                encoding_format="base64"
             )
             
-            embedding = response.data[0].embedding
+            embedding = _decode_embedding(response.data[0].embedding).tolist()
             logger.debug(f"✅ Generated embedding of dimension: {len(embedding)}")
             return embedding
             
@@ -125,7 +163,7 @@ class EmbeddingService:
             logger.error(f"❌ Error embedding text: {str(e)}")
             return []
     
-    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts using OpenAI API (batch)
         
@@ -133,37 +171,94 @@ class EmbeddingService:
             texts: List of texts to embed
             
         Returns:
-            List of embedding vectors
+            float32 embedding matrix (len(texts), dim); empty (0 rows) on failure
         """
         try:
             if not self.validate_model():
                 logger.error("Cannot embed - client not ready")
-                return []
+                return self._empty_embeddings()
             
             if not texts:
                 logger.warning("Empty text list provided")
-                return []
+                return self._empty_embeddings()
             
             logger.info(f"Embedding {len(texts)} texts in batch mode with OpenAI...")
             
-            # OpenAI API can handle multiple texts in one request
-            response = self.client.embeddings.create(
-                input=texts,
-                model=self.model_name
-            )
-            
-            # Extract embeddings in the same order as input
-            embeddings = [data.embedding for data in response.data]
+            if self.disk_cache is not None:
+                embeddings = await self._embed_with_disk_cache(texts)
+            else:
+                embeddings = await self._embed_many(texts)
             
             logger.info(f"✅ Generated {len(embeddings)} embeddings from OpenAI API")
-            logger.info(f"   Dimension per embedding: {len(embeddings[0]) if embeddings else 0}")
-            logger.debug(f"   Usage - Tokens: {response.usage.total_tokens if hasattr(response, 'usage') else 'N/A'}")
+            logger.info(f"   Dimension per embedding: {embeddings.shape[1]}")
             
             return embeddings
             
         except Exception as e:
             logger.error(f"❌ Error embedding texts batch: {str(e)}")
-            return []
+            return self._empty_embeddings()
+    
+    async def _embed_with_disk_cache(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, taking those seen before from the disk cache"""
+        keys = [EmbeddingDiskCache.key(self.model_name, text) for text in texts]
+        cached = await asyncio.to_thread(self.disk_cache.get_many, keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        logger.info(f"   Embedding disk cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        
+        fresh = None
+        if missing:
+            fresh = await self._embed_many([texts[i] for i in missing])
+            await asyncio.to_thread(
+                self.disk_cache.set_many,
+                {keys[i]: fresh[j] for j, i in enumerate(missing)}
+            )
+        
+        dimension = fresh.shape[1] if fresh is not None else len(cached[keys[0]])
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        for i, key in enumerate(keys):
+            if key in cached:
+                embeddings[i] = cached[key]
+        if fresh is not None:
+            embeddings[missing] = fresh
+        return embeddings
+    
+    async def _embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts with concurrent API requests of up to EMBED_REQUEST_SIZE texts"""
+        # Group texts of similar length so requests carry similar token counts,
+        # then send the requests concurrently
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        groups = [
+            order[start:start + EMBED_REQUEST_SIZE]
+            for start in range(0, len(order), EMBED_REQUEST_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(EMBED_REQUEST_CONCURRENCY)
+        
+        async def embed_group(group: List[int]) -> np.ndarray:
+            async with semaphore:
+                return await self._embed_request([texts[i] for i in group])
+        
+        group_embeddings = await asyncio.gather(*(embed_group(group) for group in groups))
+        
+        # Put embeddings back in the same order as input
+        embeddings = np.empty((len(texts), group_embeddings[0].shape[1]), dtype=np.float32)
+        for group, vectors in zip(groups, group_embeddings):
+            embeddings[group] = vectors
+        return embeddings
+    
+    async def _embed_request(self, texts: List[str]) -> np.ndarray:
+        """Embed texts with a single embeddings API request (order preserved)"""
+        response = await asyncio.to_thread(
+            self.client.embeddings.create,
+            input=texts,
+            model=self.model_name,
+            encoding_format="base64"
+        )
+        logger.debug(f"   Usage - Tokens: {response.usage.total_tokens if hasattr(response, 'usage') else 'N/A'}")
+        return np.stack([_decode_embedding(data.embedding) for data in response.data])
+    
+    def _empty_embeddings(self) -> np.ndarray:
+        """Zero-row embedding matrix returned when embedding fails"""
+        return np.empty((0, self.embedding_dimension), dtype=np.float32)
 
 
 class VectorStore:
@@ -183,50 +278,35 @@ class VectorStore:
         self.embedding_dimension = settings.embedding_dimension
         self.client = None
         self.collection = None
+        self._count_cache = TTLCache(maxsize=1, ttl=COUNT_CACHE_TTL)
+        self._known_document_ids = set()
         
         logger.info(f"Initializing vector store with backend: {self.backend}")
         
-        if self.backend == "chroma" or self.backend == "chroma_ephemeral" or self.backend == "chroma_persistent":
+        if self.backend in CHROMA_BACKENDS:
             self._init_chroma()
         else:
             logger.warning(f"⚠️  Unknown backend: {self.backend}")
     
     def _init_chroma(self):
-        """Initialize ChromaDB client and collection with persistent storage"""
+        """Initialize ChromaDB client (server if configured, else local persistent storage) and collection"""
         try:
             if not chromadb:
                 logger.error("[ERROR] chromadb not installed")
                 return
             
-            logger.info("[INFO] Initializing ChromaDB client with PERSISTENT storage...")
-            
-            # Create persistent database directory with absolute path
-            import os
-            from pathlib import Path
-            
-            # Use absolute path to avoid Windows path issues
-            db_path = Path(settings.vector_db_path).absolute()
-            logger.info(f"[INFO] Vector DB Path: {db_path}")
-            
-            # Create directory if it doesn't exist
-            try:
-                db_path.mkdir(parents=True, exist_ok=True)
-                logger.info(f"[INFO] Created/verified DB directory: {db_path}")
-            except Exception as e:
-                logger.warning(f"[WARNING] Could not create DB directory: {e}")
-            
-            try:
-                # Try PersistentClient first
-                logger.info("[INFO] Attempting PersistentClient with absolute path...")
-                self.client = chromadb.PersistentClient(path=str(db_path))
-                logger.info("[OK] ChromaDB PERSISTENT client initialized successfully")
-                self.backend = "chroma_persistent"
-            except Exception as e:
-                logger.warning(f"[WARNING] PersistentClient failed: {str(e)}")
-                logger.info("[FALLBACK] Falling back to EphemeralClient (RAM only)...")
-                self.client = chromadb.EphemeralClient()
-                logger.warning("[WARNING] Using EphemeralClient - data will NOT persist after restart!")
-                self.backend = "chroma_ephemeral"
+            if settings.chroma_server_host:
+                # Client/server mode: writes and queries go to a separate Chroma process.
+                # No local fallback - documents stored locally would be invisible to the server.
+                logger.info(f"[INFO] Connecting to ChromaDB server at {settings.chroma_server_host}:{settings.chroma_server_port}...")
+                self.client = chromadb.HttpClient(
+                    host=settings.chroma_server_host,
+                    port=settings.chroma_server_port
+                )
+                self.backend = "chroma_http"
+                logger.info("[OK] ChromaDB HTTP client initialized successfully")
+            else:
+                self._init_chroma_local()
             
             # Get or create collection
             self.collection = self.client.get_or_create_collection(
@@ -237,17 +317,93 @@ class VectorStore:
             
             # Log collection stats
             try:
-                collection_count = self.collection.count()
+                collection_count = self.count()
                 logger.info(f"[INFO] Collection contains {collection_count} vectors (Backend: {self.backend})")
             except:
                 logger.info("[INFO] Collection count not available")
             
+            self._load_known_document_ids()
+            
         except Exception as e:
             logger.error(f"[ERROR] Error initializing ChromaDB: {str(e)}")
             self.client = None
             self.collection = None
             self.backend = None
     
+    def _init_chroma_local(self):
+        """Create a local ChromaDB client, persistent if possible, in-memory otherwise"""
+        logger.info("[INFO] Initializing ChromaDB client with PERSISTENT storage...")
+        
+        # Create persistent database directory with absolute path
+        import os
+        from pathlib import Path
+        
+        # Use absolute path to avoid Windows path issues
+        db_path = Path(settings.vector_db_path).absolute()
+        logger.info(f"[INFO] Vector DB Path: {db_path}")
+        
+        # Create directory if it doesn't exist
+        try:
+            db_path.mkdir(parents=True, exist_ok=True)
+            logger.info(f"[INFO] Created/verified DB directory: {db_path}")
+        except Exception as e:
+            logger.warning(f"[WARNING] Could not create DB directory: {e}")
+        
+        try:
+            # Try PersistentClient first
+            logger.info("[INFO] Attempting PersistentClient with absolute path...")
+            self.client = chromadb.PersistentClient(path=str(db_path))
+            logger.info("[OK] ChromaDB PERSISTENT client initialized successfully")
+            self.backend = "chroma_persistent"
+        except Exception as e:
+            logger.warning(f"[WARNING] PersistentClient failed: {str(e)}")
+            logger.info("[FALLBACK] Falling back to EphemeralClient (RAM only)...")
+            self.client = chromadb.EphemeralClient()
+            logger.warning("[WARNING] Using EphemeralClient - data will NOT persist after restart!")
+            self.backend = "chroma_ephemeral"
+    
+    def _load_known_document_ids(self):
+        """Populate the local set of stored document IDs from the collection's chunk IDs"""
+        try:
+            ids = self.collection.get(include=[])["ids"]
+            for chunk_id in ids:
+                match = _CHUNK_ID_RE.match(chunk_id)
+                if match:
+                    self._known_document_ids.add(match.group(1))
+            logger.info(f"[INFO] Loaded {len(self._known_document_ids)} known document IDs")
+        except Exception as e:
+            logger.warning(f"[WARNING] Could not load known document IDs: {e}")
+    
+    def count(self) -> int:
+        """
+        Number of vectors in the collection, cached for COUNT_CACHE_TTL seconds
+        
+        Returns:
+            Vector count (0 if no collection)
+        """
+        if not self.collection:
+            return 0
+        count = self._count_cache.get("count")
+        if count is None:
+            count = self.collection.count()
+            self._count_cache["count"] = count
+        return count
+    
+    async def count_async(self) -> int:
+        """
+        Same as count, with the store round trip run off the event loop
+        
+        Returns:
+            Vector count (0 if no collection)
+        """
+        if not self.collection:
+            return 0
+        count = self._count_cache.get("count")
+        if count is None:
+            count = await asyncio.to_thread(self.collection.count)
+            self._count_cache["count"] = count
+        return count
+    
     def _compute_file_hash(self, file_path: str) -> str:
         """
         Compute SHA256 hash of a file
@@ -264,7 +420,7 @@ class VectorStore:
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
     
-    def check_document_exists(self, document_id: str) -> bool:
+    async def check_document_exists(self, document_id: str) -> bool:
         """
         Check if document already exists in vector store
         
@@ -278,15 +434,23 @@ class VectorStore:
             if not self.collection:
                 return False
             
-            # Get all documents with matching document_id prefix
-            results = self.collection.get(
-                where={"document_id": {"$eq": document_id}}
+            if document_id in self._known_document_ids:
+                logger.info(f"[WARNING] Document {document_id} already exists in vector store")
+                return True
+            
+            # Not known locally - ask the store (it may have been written by another process)
+            results = await asyncio.to_thread(
+                self.collection.get,
+                where={"document_id": {"$eq": document_id}},
+                limit=1,
+                include=[]
             )
             
             exists = len(results['ids']) > 0 if results else False
             
             if exists:
-                logger.info(f"[WARNING] Document {document_id} already exists in vector store ({len(results['ids'])} chunks)")
+                self._known_document_ids.add(document_id)
+                logger.info(f"[WARNING] Document {document_id} already exists in vector store")
             
             return exists
             
@@ -309,7 +473,8 @@ class VectorStore:
                 return []
             
             # Query for all chunks with this document_id
-            results = self.collection.get(
+            results = await asyncio.to_thread(
+                self.collection.get,
                 where={"document_id": {"$eq": document_id}}
             )
             
@@ -325,10 +490,34 @@ class VectorStore:
             logger.error(f"[ERROR] Error retrieving chunks: {str(e)}")
             return []
     
+    async def get_embeddings(self, chunk_ids: List[str]) -> np.ndarray:
+        """
+        Fetch stored embeddings for the given chunks
+        
+        Args:
+            chunk_ids: Chunk IDs to fetch
+            
+        Returns:
+            Float32 matrix (len(chunk_ids), dim) in the order of chunk_ids
+        """
+        if not self.collection:
+            raise RuntimeError("Vector store not initialized")
+        
+        results = await asyncio.to_thread(
+            self.collection.get,
+            ids=chunk_ids,
+            include=["embeddings"]
+        )
+        by_id = dict(zip(results["ids"], results["embeddings"]))
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in by_id]
+        if missing:
+            raise KeyError(f"No stored embedding for {len(missing)} chunk(s)")
+        return np.asarray([by_id[chunk_id] for chunk_id in chunk_ids], dtype=np.float32)
+    
     async def add_vectors(
         self,
         chunk_ids: List[str],
-        embeddings: List[List[float]],
+        embeddings: np.ndarray,
         metadata: List[Dict]
     ) -> Dict:
         """
@@ -336,7 +525,7 @@ class VectorStore:
         
         Args:
             chunk_ids: List of unique chunk IDs
-            embeddings: List of embedding vectors
+            embeddings: Embedding matrix (n, dim) or list of embedding vectors
             metadata: List of metadata dictionaries for each chunk
             
         Returns:
@@ -359,36 +548,37 @@ class VectorStore:
                 raise ValueError(f"Embeddings count ({len(embeddings)}) != Metadata count ({len(metadata)})")
             
             # Validate embeddings
-            for i, emb in enumerate(embeddings):
-                if not isinstance(emb, list) or len(emb) == 0:
-                    logger.error(f"[ADD_VECTORS ERROR] Invalid embedding at index {i}")
-                    raise ValueError(f"Invalid embedding at index {i}")
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            if embeddings.ndim != 2 or embeddings.shape[1] == 0:
+                logger.error(f"[ADD_VECTORS ERROR] Invalid embeddings shape: {embeddings.shape}")
+                raise ValueError(f"Invalid embeddings shape: {embeddings.shape}")
             
-            logger.debug(f"[ADD_VECTORS DEBUG] First embedding dimension: {len(embeddings[0])}")
+            logger.debug(f"[ADD_VECTORS DEBUG] Embedding dimension: {embeddings.shape[1]}")
             logger.debug(f"[ADD_VECTORS DEBUG] Metadata sample: {metadata[0] if metadata else 'none'}")
             logger.info(f"[ADD_VECTORS] Validation passed. Storing {len(chunk_ids)} vectors...")
             
-            if (self.backend == "chroma" or self.backend == "chroma_ephemeral" or self.backend == "chroma_persistent") and self.collection:
+            if self.backend in CHROMA_BACKENDS and self.collection:
                 # Prepare documents and metadatas for ChromaDB
                 documents = [meta.get("text", "") for meta in metadata]
                 
                 logger.debug(f"[ADD_VECTORS DEBUG] About to UPSERT to ChromaDB ({self.backend})")
                 logger.debug(f"[ADD_VECTORS DEBUG] Chunk IDs: {chunk_ids[:3] + ['...'] if len(chunk_ids) > 3 else chunk_ids}")
                 
-                self.collection.upsert(
+                # chromadb 0.4 only accepts plain lists; upsert blocks, so run it off the event loop
+                await asyncio.to_thread(
+                    self.collection.upsert,
                     ids=chunk_ids,
-                    embeddings=embeddings,
+                    embeddings=embeddings.tolist(),
                     documents=documents,
                     metadatas=metadata
                 )
                 
-                # Verify insertion
-                try:
-                    collection_count = self.collection.count()
-                    logger.info(f"[ADD_VECTORS SUCCESS] Added {len(chunk_ids)} vectors. Collection now has {collection_count} total vectors")
-                except Exception as e:
-                    logger.debug(f"[ADD_VECTORS] Could not get final count: {e}")
-                    logger.info(f"[ADD_VECTORS SUCCESS] Added {len(chunk_ids)} vectors to ChromaDB")
+                self._count_cache.clear()
+                self._known_document_ids.update(
+                    meta["document_id"] for meta in metadata if meta.get("document_id")
+                )
+                # No post-insert count: it would be a store round trip per sub-batch
+                logger.info(f"[ADD_VECTORS SUCCESS] Added {len(chunk_ids)} vectors to ChromaDB")
             else:
                 logger.warning(f"[ADD_VECTORS WARNING] No backend implementation for {self.backend}")
             
@@ -396,7 +586,7 @@ class VectorStore:
                 "success": True,
                 "added": len(chunk_ids),
                 "backend": self.backend,
-                "dimension": len(embeddings[0]) if embeddings else 0
+                "dimension": embeddings.shape[1]
             }
             
         except Exception as e:
@@ -433,16 +623,18 @@ class VectorStore:
             logger.debug(f"[SEARCH DEBUG] Backend: {self.backend}")
             logger.debug(f"[SEARCH DEBUG] Collection available: {self.collection is not None}")
             
-            if (self.backend == "chroma" or self.backend == "chroma_ephemeral" or self.backend == "chroma_persistent") and self.collection:
+            if self.backend in CHROMA_BACKENDS and self.collection:
                 # Check collection count before search
-                try:
-                    collection_count = self.collection.count()
-                    logger.debug(f"[SEARCH DEBUG] Collection has {collection_count} vectors total")
-                except Exception as e:
-                    logger.debug(f"[SEARCH DEBUG] Could not get collection count: {e}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    try:
+                        collection_count = await self.count_async()
+                        logger.debug(f"[SEARCH DEBUG] Collection has {collection_count} vectors total")
+                    except Exception as e:
+                        logger.debug(f"[SEARCH DEBUG] Could not get collection count: {e}")
                 
                 logger.debug(f"[SEARCH DEBUG] Executing ChromaDB query...")
-                results = self.collection.query(
+                results = await asyncio.to_thread(
+                    self.collection.query,
                     query_embeddings=[query_embedding],
                     n_results=top_k
                 )
@@ -487,8 +679,11 @@ class VectorStore:
         try:
             logger.info(f"Deleting {len(chunk_ids)} vectors from {self.backend}")
             
-            if (self.backend == "chroma" or self.backend == "chroma_ephemeral" or self.backend == "chroma_persistent") and self.collection:
-                self.collection.delete(ids=chunk_ids)
+            if self.backend in CHROMA_BACKENDS and self.collection:
+                await asyncio.to_thread(self.collection.delete, ids=chunk_ids)
+                # Deleted chunks may empty a document; fall back to asking the store
+                self._count_cache.clear()
+                self._known_document_ids.clear()
                 logger.info(f"✅ Deleted {len(chunk_ids)} vectors from ChromaDB")
             
             return {
@@ -500,3 +695,35 @@ class VectorStore:
         except Exception as e:
             logger.error(f"❌ Error deleting vectors: {str(e)}")
             return {"success": False, "error": str(e)}
+    
+    async def delete_document(self, document_id: str) -> Dict:
+        """
+        Delete every vector of a document from the store
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            Status dictionary
+        """
+        try:
+            logger.info(f"Deleting vectors of document {document_id} from {self.backend}")
+            
+            if self.backend in CHROMA_BACKENDS and self.collection:
+                await asyncio.to_thread(
+                    self.collection.delete,
+                    where={"document_id": {"$eq": document_id}}
+                )
+                self._count_cache.clear()
+                self._known_document_ids.discard(document_id)
+                logger.info(f"✅ Deleted vectors of document {document_id} from ChromaDB")
+            
+            return {
+                "success": True,
+                "document_id": document_id,
+                "backend": self.backend
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Error deleting document vectors: {str(e)}")
+            return {"success": False, "error": str(e)}
@@ -4,12 +4,14 @@ Implements Tesseract-based OCR for scanned documents
 """
 
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Union
+import asyncio
 import logging
 import numpy as np
 from datetime import datetime
 from io import BytesIO
 
+import aiofiles
 import pytesseract
 from pdf2image import convert_from_path
 from pdf2image.exceptions import PDFInfoNotInstalledError
@@ -21,6 +23,16 @@ from app.config.settings import settings
 logger = logging.getLogger(__name__)
 
 
+async def _iter_pages(pages: Union[List[Dict], AsyncIterator[Dict]]) -> AsyncIterator[Dict]:
+    """Iterate pages from a list or an async iterator alike"""
+    if hasattr(pages, "__aiter__"):
+        async for page in pages:
+            yield page
+    else:
+        for page in pages:
+            yield page
+
+
 class OCRProcessor:
     """Handles OCR processing for scanned PDFs"""
     
@@ -164,14 +176,25 @@ class OCRProcessor:
             logger.error(f"❌ Error extracting images with PyMuPDF: {str(e)}", exc_info=True)
             return []
     
-    async def save_extracted_text(self, pages_content: List[Dict], document_id: str, filename: str) -> str:
+    async def save_extracted_text(
+        self,
+        pages_content: Union[List[Dict], AsyncIterator[Dict]],
+        document_id: str,
+        filename: str,
+        total_pages: Optional[int] = None
+    ) -> str:
         """
         Save extracted OCR text to files
         
+        Pages are written as they arrive, so an async iterator of pages is
+        never held in memory all at once.
+        
         Args:
-            pages_content: List of page data with extracted text
+            pages_content: Page data with extracted text (list or async iterator)
             document_id: Document ID
             filename: Original filename
+            total_pages: Page count for the combined file header (defaults to
+                the list length; omitted from the header if unknown)
             
         Returns:
             Path to the saved text file
@@ -181,43 +204,52 @@ class OCRProcessor:
             doc_text_dir = self.extracted_text_dir / document_id
             doc_text_dir.mkdir(parents=True, exist_ok=True)
             
-            # Save combined text
             combined_text_file = doc_text_dir / f"{Path(filename).stem}_full.txt"
-            combined_text = []
-            
-            # Save individual page texts
-            for page_data in pages_content:
-                page_num = page_data.get("page_number", 0)
-                text = page_data.get("text", "")
-                confidence = page_data.get("confidence", 0)
+            extracted_at = datetime.now().isoformat()
+            if total_pages is None and isinstance(pages_content, list):
+                total_pages = len(pages_content)
+            
+            combined_header = (
+                f"Document: {filename}\n"
+                f"Document ID: {document_id}\n"
+                f"Extracted: {extracted_at}\n"
+                + (f"Total Pages: {total_pages}\n" if total_pages is not None else "")
+                + "=" * 70 + "\n\n"
+            )
+            
+            page_writes = []
+            page_count = 0
+            async with aiofiles.open(combined_text_file, "wb") as combined:
+                await combined.write(combined_header.encode("utf-8"))
                 
-                # Save individual page file
-                page_file = doc_text_dir / f"page_{page_num + 1}.txt"
-                with open(page_file, "w", encoding="utf-8") as f:
-                    f.write(f"=== Page {page_num + 1} ===\n")
-                    f.write(f"OCR Confidence: {confidence:.2%}\n")
-                    f.write(f"Extracted at: {datetime.now().isoformat()}\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(text)
-                
-                logger.debug(f"Saved page text: {page_file}")
-                
-                # Add to combined text
-                combined_text.append(f"=== Page {page_num + 1} (Confidence: {confidence:.2%}) ===\n{text}")
-            
-            # Save combined text file
-            combined_content = "\n\n".join(combined_text)
-            with open(combined_text_file, "w", encoding="utf-8") as f:
-                f.write(f"Document: {filename}\n")
-                f.write(f"Document ID: {document_id}\n")
-                f.write(f"Extracted: {datetime.now().isoformat()}\n")
-                f.write(f"Total Pages: {len(pages_content)}\n")
-                f.write("=" * 70 + "\n\n")
-                f.write(combined_content)
+                async for page_data in _iter_pages(pages_content):
+                    page_num = page_data.get("page_number", 0)
+                    text = page_data.get("text", "")
+                    confidence = page_data.get("confidence", 0)
+                    
+                    # Append to the combined file
+                    separator = "\n\n" if page_count else ""
+                    await combined.write(
+                        f"{separator}=== Page {page_num + 1} (Confidence: {confidence:.2%}) ===\n{text}".encode("utf-8")
+                    )
+                    
+                    # Write the individual page file in the background
+                    page_file = doc_text_dir / f"page_{page_num + 1}.txt"
+                    page_content = (
+                        f"=== Page {page_num + 1} ===\n"
+                        f"OCR Confidence: {confidence:.2%}\n"
+                        f"Extracted at: {extracted_at}\n"
+                        + "=" * 50 + "\n\n"
+                        + text
+                    ).encode("utf-8")
+                    page_writes.append(asyncio.create_task(asyncio.to_thread(page_file.write_bytes, page_content)))
+                    page_count += 1
+            
+            await asyncio.gather(*page_writes)
             
             logger.info(f"✅ Extracted text saved to: {combined_text_file}")
             logger.info(f"   Individual pages saved in: {doc_text_dir}")
-            logger.info(f"   Total pages: {len(pages_content)}")
+            logger.info(f"   Total pages: {page_count}")
             
             return str(combined_text_file)
             
@@ -303,11 +335,14 @@ class OCRProcessor:
     def _calculate_confidence(self, ocr_data: Dict) -> float:
         """Calculate overall OCR confidence score"""
         try:
-            confidences = ocr_data.get("conf", [])
-            valid_confidences = [c for c in confidences if c > 0]
-            
-            if valid_confidences:
-                avg_confidence = sum(valid_confidences) / len(valid_confidences) / 100
+            # Keep the per-word confidences as one compact array in the page's OCR data
+            # (float32, since Tesseract 4+ reports fractional confidences; -1 marks non-words)
+            confidences = np.asarray(ocr_data.get("conf", []), dtype=np.float32)
+            ocr_data["conf"] = confidences
+            valid_confidences = confidences[confidences > 0]
+            
+            if valid_confidences.size:
+                avg_confidence = float(valid_confidences.mean()) / 100
                 return max(0.0, min(1.0, avg_confidence))  # Clamp between 0 and 1
             
             logger.debug("No confidence data available from OCR")
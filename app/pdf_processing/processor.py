@@ -5,7 +5,8 @@ Detects if PDF is scanned (image-based) or text-based and applies appropriate pr
 
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import AsyncIterator, Dict, List, Tuple, Optional
+import asyncio
 import logging
 
 import pymupdf
@@ -95,25 +96,7 @@ class PDFProcessor:
         try:
             logger.info("Extracting text from text-based PDF...")
             doc = pymupdf.open(pdf_path)
-            pages_content = []
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                blocks = page.get_text("blocks")
-                
-                logger.debug(f"  Page {page_num + 1}: {len(text)} characters extracted")
-                
-                page_data = {
-                    "page_number": page_num,
-                    "text": text,
-                    "blocks": blocks,  # Contains bbox info
-                    "height": page.rect.height,
-                    "width": page.rect.width,
-                    "pdf_type": PDFType.TEXT.value
-                }
-                pages_content.append(page_data)
-            
+            pages_content = self._extract_text_pages(doc, 0, len(doc))
             doc.close()
             logger.info(f"✅ Extracted text from {len(pages_content)} pages")
             
@@ -123,6 +106,80 @@ class PDFProcessor:
             logger.error(f"❌ Error extracting text from PDF: {str(e)}", exc_info=True)
             return []
     
+    def _extract_text_pages(self, doc, start: int, end: int) -> List[Dict]:
+        """
+        Extract text and metadata for a range of pages of an open PDF
+        
+        Args:
+            doc: Open PyMuPDF document
+            start: First page index (inclusive)
+            end: Last page index (exclusive)
+            
+        Returns:
+            List of dicts with page text, page number, and bbox info
+        """
+        pages_content = []
+        
+        for page_num in range(start, end):
+            page = doc[page_num]
+            text = page.get_text()
+            blocks = page.get_text("blocks")
+            
+            logger.debug(f"  Page {page_num + 1}: {len(text)} characters extracted")
+            
+            page_data = {
+                "page_number": page_num,
+                "text": text,
+                "blocks": blocks,  # Contains bbox info
+                "height": page.rect.height,
+                "width": page.rect.width,
+                "pdf_type": PDFType.TEXT.value
+            }
+            pages_content.append(page_data)
+        
+        return pages_content
+    
+    async def iter_pages(
+        self,
+        pdf_path: Path,
+        pdf_type: PDFType,
+        document_id: str = None,
+        filename: str = None,
+        batch_size: int = 8
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Extract page content in batches, yielding each batch as soon as it is ready
+        
+        Text PDFs are extracted batch_size pages at a time in a worker thread.
+        Scanned PDFs are OCR'd in full and yielded as a single batch.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            pdf_type: Detected PDF type
+            document_id: Document ID (optional, for saving extracted OCR text)
+            filename: Original filename (optional, for saving extracted OCR text)
+            batch_size: Number of text pages per batch
+            
+        Yields:
+            Lists of page content dictionaries
+        """
+        if pdf_type == PDFType.SCANNED:
+            logger.info("  Using OCR extraction (Tesseract)...")
+            pages_content = await self.extract_scanned_pdf(pdf_path, document_id, filename)
+            if pages_content:
+                yield pages_content
+            return
+        
+        logger.info("  Using text extraction (PyMuPDF)...")
+        doc = pymupdf.open(pdf_path)
+        try:
+            total_pages = len(doc)
+            for start in range(0, total_pages, batch_size):
+                end = min(start + batch_size, total_pages)
+                yield await asyncio.to_thread(self._extract_text_pages, doc, start, end)
+        finally:
+            doc.close()
+    
     async def extract_scanned_pdf(self, pdf_path: Path, document_id: str = None, filename: str = None) -> List[Dict]:
         """
         Extract text from scanned PDF using OCR
@@ -142,7 +199,7 @@ class PDFProcessor:
             
             # Save extracted text to files if document_id and filename provided
             if document_id and filename and pages_content:
-                text_file = self.ocr_processor.save_extracted_text(pages_content, document_id, filename)
+                text_file = await self.ocr_processor.save_extracted_text(pages_content, document_id, filename)
                 logger.info(f"Extracted text saved: {text_file}")
             
             return pages_content
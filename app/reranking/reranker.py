@@ -3,7 +3,8 @@ Query Reranker Module
 Wrapper for cross-encoder reranking from retriever
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import asyncio
 import logging
 
 from app.retrieval.retriever import Reranker as BaseReranker
@@ -18,7 +19,7 @@ class QueryReranker:
         """Initialize query reranker"""
         self._reranker = BaseReranker()
     
-    async def rerank(self, query: str, texts: List[str], top_k: int = 5) -> List[float]:
+    async def rerank(self, query: str, texts: List[str], top_k: int = 5) -> Optional[List[float]]:
         """
         Rerank texts based on relevance to query
         
@@ -28,12 +29,14 @@ class QueryReranker:
             top_k: Number of top results
             
         Returns:
-            List of relevance scores
+            List of relevance scores, or None if the cross-encoder is unavailable or fails
         """
         try:
-            if not self._reranker.model or not texts:
-                # Return equal scores if model not available
-                return [0.5] * len(texts)
+            if not texts:
+                return []
+            if not self._reranker.model:
+                logger.warning("Cross-encoder not available - no rerank scores")
+                return None
             
             # Create query-text pairs
             pairs = [[query, text] for text in texts]
@@ -46,5 +49,42 @@ class QueryReranker:
             
         except Exception as e:
             logger.error(f"Error in reranking: {str(e)}")
-            # Return neutral scores if reranking fails
-            return [0.5] * len(texts)
+            return None
+    
+    async def rerank_batch(self, requests: List[Tuple[str, List[str]]]) -> List[Optional[List[float]]]:
+        """
+        Rerank several (query, texts) requests with a single cross-encoder call
+        
+        Args:
+            requests: List of (query, texts) pairs
+            
+        Returns:
+            List of relevance score lists, one per request (each None if the
+            cross-encoder is unavailable or fails)
+        """
+        try:
+            if not self._reranker.model:
+                logger.warning("Cross-encoder not available - no rerank scores")
+                return [None] * len(requests)
+            
+            # Flatten all query-text pairs into one batch
+            pairs = [[query, text] for query, texts in requests for text in texts]
+            if not pairs:
+                return [[] for _ in requests]
+            
+            # Up to max_batch_size x top_k pairs; predict runs in a worker thread to keep the loop free
+            scores = list(await asyncio.to_thread(self._reranker.model.predict, pairs))
+            
+            # Split scores back per request
+            results = []
+            offset = 0
+            for _, texts in requests:
+                results.append(scores[offset:offset + len(texts)])
+                offset += len(texts)
+            
+            logger.debug(f"Reranked {len(pairs)} texts across {len(requests)} queries")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in batch reranking: {str(e)}")
+            return [None] * len(requests)
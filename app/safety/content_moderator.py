@@ -4,8 +4,10 @@ Uses OpenAI's moderation API to detect and filter harmful content
 Checks for hate speech, violence, and other policy violations
 """
 
+import asyncio
 import logging
 from typing import Dict, Tuple
+import orjson
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -27,6 +29,7 @@ class ContentModerator:
             "violence",  # Content that promotes, encourages, or depicts acts of violence
             "harassment",  # Content that is meant to harass or bully an individual
         ]
+        self._categories_set = frozenset(self.categories_to_check)
     
     def _initialize_client(self):
         """Initialize OpenAI client for moderation"""
@@ -56,7 +59,7 @@ class ContentModerator:
         
         try:
             logger.info("[MODERATION] Checking user input for harmful content...")
-            logger.debug(f"   Input length: {len(text)} characters")
+            logger.debug("   Input length: %d characters", len(text))
             
             result = await self._moderate_text(text, stage="input")
             
@@ -89,7 +92,7 @@ class ContentModerator:
         
         try:
             logger.info("[MODERATION] Checking LLM output for harmful content...")
-            logger.debug(f"   Output length: {len(text)} characters")
+            logger.debug("   Output length: %d characters", len(text))
             
             result = await self._moderate_text(text, stage="output")
             
@@ -117,29 +120,25 @@ class ContentModerator:
             Dictionary with moderation results
         """
         try:
-            logger.debug(f"[MODERATION] Calling OpenAI moderation API ({stage})...")
+            logger.debug("[MODERATION] Calling OpenAI moderation API (%s)...", stage)
             
-            # Call OpenAI moderation API
-            response = self.client.moderations.create(input=text)
+            # Call OpenAI moderation API (raw response, parsed with orjson)
+            raw_response = await asyncio.to_thread(
+                self.client.moderations.with_raw_response.create,
+                input=text
+            )
             
-            logger.debug(f"[MODERATION] API response received")
+            logger.debug("[MODERATION] API response received")
             
-            # Check if any category is flagged
-            result = response.results[0]
+            flagged, categories, scores = self._parse_moderation_response(raw_response)
             
-            if result.flagged:
-                # Extract violated categories
-                violated = []
-                violations_detail = {}
+            if flagged:
+                violated = sorted(c for c in self._categories_set if categories.get(c))
+                violations_detail = {c: scores.get(c, 0.0) for c in violated}
                 
-                for category in self.categories_to_check:
-                    if hasattr(result.categories, category):
-                        category_flagged = getattr(result.categories, category)
-                        if category_flagged:
-                            violated.append(category)
-                            category_score = getattr(result.category_scores, category, 0.0)
-                            violations_detail[category] = category_score
-                            logger.debug(f"     - {category}: {category_score:.2%}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    for category, category_score in violations_detail.items():
+                        logger.debug(f"     - {category}: {category_score:.2%}")
                 
                 return {
                     "flagged": True,
@@ -158,6 +157,31 @@ class ContentModerator:
             logger.error(f"[MODERATION] Error in moderation API call: {str(e)}")
             raise
     
+    def _parse_moderation_response(self, raw_response) -> Tuple[bool, Dict, Dict]:
+        """
+        Extract the first moderation result from a raw API response
+        
+        Parses the JSON body directly with orjson and falls back to the SDK's
+        pydantic models if the payload does not have the expected shape.
+        
+        Args:
+            raw_response: Raw response from moderations.with_raw_response.create
+            
+        Returns:
+            Tuple of (flagged, categories, category_scores) keyed by API category name
+        """
+        try:
+            result = orjson.loads(raw_response.content)["results"][0]
+            return result["flagged"], result["categories"], result["category_scores"]
+        except (KeyError, IndexError, TypeError, orjson.JSONDecodeError):
+            logger.debug("[MODERATION] Unexpected raw response shape, falling back to SDK parsing")
+            result = raw_response.parse().results[0]
+            return (
+                result.flagged,
+                result.categories.model_dump(by_alias=True),
+                result.category_scores.model_dump(by_alias=True)
+            )
+    
     def get_violation_message(self, moderation_result: Dict, stage: str = "input") -> str:
         """
         Generate user-friendly message for policy violation
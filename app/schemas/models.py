@@ -75,6 +75,7 @@ class DocumentUploadResponse(BaseModel):
     """Response model for document upload"""
     success: bool
     document_id: str
+    upload_id: Optional[str] = None
     document_name: str
     storage_path: str
     pdf_type: str
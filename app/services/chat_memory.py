@@ -4,13 +4,36 @@ Handles conversation history, context management, and memory optimization
 """
 
 import logging
-import json
-from typing import List, Dict, Optional
+import sqlite3
+import time
+from functools import cached_property
+from itertools import islice
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
+import orjson
+from cachetools import LRUCache
+
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENC = None
 
 logger = logging.getLogger(__name__)
 
+# Per-message overhead for role and formatting tokens in the chat prompt
+MESSAGE_TOKEN_OVERHEAD = 4
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text (falls back to ~4 chars per token without tiktoken)"""
+    if not text:
+        return 0
+    if _ENC is not None:
+        return len(_ENC.encode(text))
+    return max(1, len(text) // 4)
+
 
 class ConversationMessage:
     """Represents a single message in conversation"""
@@ -35,9 +58,14 @@ class ConversationMessage:
         self.content = content
         self.timestamp = timestamp or datetime.utcnow().isoformat()
         self.metadata = metadata or {}
+        self.tokens = count_tokens(self.content)
+        # Role labels used when rendering history (role never changes)
+        self._prompt_prefix = "👤 User:" if role == "user" else "🤖 Assistant:"
+        self._text_prefix = "User:" if role == "user" else "Assistant:"
     
-    def to_dict(self) -> Dict:
-        """Convert message to dictionary"""
+    @cached_property
+    def as_dict(self) -> Dict:
+        """Dictionary form of the message (cached - messages are not mutated after creation)"""
         return {
             "role": self.role,
             "content": self.content,
@@ -45,6 +73,10 @@ class ConversationMessage:
             "metadata": self.metadata
         }
     
+    def to_dict(self) -> Dict:
+        """Convert message to dictionary"""
+        return self.as_dict
+    
     @classmethod
     def from_dict(cls, data: Dict) -> "ConversationMessage":
         """Create message from dictionary"""
@@ -66,7 +98,7 @@ class ChatMemory:
         Args:
             session_id: Unique conversation session ID
             max_messages: Maximum messages to keep in memory
-            max_tokens: Maximum tokens to keep (rough estimate: 1 message ≈ 150 tokens)
+            max_tokens: Maximum tokens to keep (counted with tiktoken cl100k_base)
         """
         self.session_id = session_id
         self.messages: List[ConversationMessage] = []
@@ -75,14 +107,34 @@ class ChatMemory:
         self.created_at = datetime.utcnow()
         self.last_updated = datetime.utcnow()
         self.documents_used = set()
+        self._total_tokens = 0
+        # Rendered history strings, valid until the next change to messages
+        self._render_cache: Dict[Tuple[str, Optional[int]], str] = {}
+    
+    def _invalidate(self) -> None:
+        """Mark rendered history as stale after messages change"""
+        self._render_cache.clear()
+    
+    def _append(self, message: ConversationMessage) -> None:
+        """Append message and update running token count"""
+        self.messages.append(message)
+        self._total_tokens += message.tokens + MESSAGE_TOKEN_OVERHEAD
+        self._invalidate()
+    
+    def _evict_oldest(self) -> ConversationMessage:
+        """Remove oldest message and update running token count"""
+        removed = self.messages.pop(0)
+        self._total_tokens -= removed.tokens + MESSAGE_TOKEN_OVERHEAD
+        self._invalidate()
+        return removed
     
     def add_user_message(self, content: str, metadata: Optional[Dict] = None) -> None:
         """Add user message to memory"""
         message = ConversationMessage("user", content, metadata=metadata)
-        self.messages.append(message)
+        self._append(message)
         self.last_updated = datetime.utcnow()
         self._manage_memory()
-        logger.debug(f"[MEMORY] Added user message. Total messages: {len(self.messages)}")
+        logger.debug("[MEMORY] Added user message. Total messages: %d", len(self.messages))
     
     def add_assistant_message(
         self,
@@ -91,7 +143,7 @@ class ChatMemory:
     ) -> None:
         """Add assistant message to memory"""
         message = ConversationMessage("assistant", content, metadata=metadata)
-        self.messages.append(message)
+        self._append(message)
         self.last_updated = datetime.utcnow()
         
         # Track documents used
@@ -99,42 +151,55 @@ class ChatMemory:
             self.documents_used.update(metadata["documents_used"])
         
         self._manage_memory()
-        logger.debug(f"[MEMORY] Added assistant message. Total messages: {len(self.messages)}")
+        logger.debug("[MEMORY] Added assistant message. Total messages: %d", len(self.messages))
     
     def get_history(self, limit: Optional[int] = None) -> List[Dict]:
         """Get conversation history"""
         messages = self.messages
         if limit:
             messages = messages[-limit:]
-        return [msg.to_dict() for msg in messages]
+        return [msg.as_dict for msg in messages]
     
     def get_history_text(self, limit: Optional[int] = None) -> str:
         """Get conversation history as formatted text for LLM context"""
+        cache_key = ("text", limit)
+        cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         messages = self.messages
         if limit:
             messages = messages[-limit:]
         
         history_text = []
         for msg in messages:
-            role_label = "User" if msg.role == "user" else "Assistant"
-            history_text.append(f"{role_label}: {msg.content}")
+            history_text.append(f"{msg._text_prefix} {msg.content}")
         
-        return "\n\n".join(history_text)
+        rendered = "\n\n".join(history_text)
+        self._render_cache[cache_key] = rendered
+        return rendered
     
     def get_context_for_llm(self, last_n: int = 6) -> str:
         """Get recent conversation context for LLM (formatted for prompt inclusion)"""
-        recent_messages = self.messages[-last_n:] if len(self.messages) > last_n else self.messages
+        cache_key = ("context", last_n)
+        cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        if not recent_messages:
+        total = len(self.messages)
+        if total == 0:
             return "No previous conversation history."
         
-        context_parts = ["## Previous Conversation Context:"]
+        n = min(last_n, total) if last_n > 0 else total
+        context_parts = [None] * (n + 1)
+        context_parts[0] = "## Previous Conversation Context:"
         
-        for msg in recent_messages:
-            role = "👤 User" if msg.role == "user" else "🤖 Assistant"
-            context_parts.append(f"\n{role}:\n{msg.content}")
+        for i, msg in enumerate(islice(self.messages, total - n, None), start=1):
+            context_parts[i] = f"{msg._prompt_prefix}\n{msg.content}"
         
-        return "\n".join(context_parts)
+        rendered = "\n\n".join(context_parts)
+        self._render_cache[cache_key] = rendered
+        return rendered
     
     def get_last_user_query(self) -> Optional[str]:
         """Get last user query"""
@@ -154,22 +219,21 @@ class ChatMemory:
         """Clear conversation history"""
         self.messages = []
         self.documents_used = set()
+        self._total_tokens = 0
+        self._invalidate()
         logger.info(f"[MEMORY] Cleared conversation history for session {self.session_id}")
     
     def _manage_memory(self) -> None:
         """Manage memory by removing old messages if limit exceeded"""
         # Keep messages within both message count and token limits
         while len(self.messages) > self.max_messages:
-            removed = self.messages.pop(0)
-            logger.debug(f"[MEMORY] Removed oldest message (max_messages: {self.max_messages})")
+            self._evict_oldest()
+            logger.debug("[MEMORY] Removed oldest message (max_messages: %d)", self.max_messages)
         
-        # Rough token management (estimate 150 tokens per message)
-        estimated_tokens = len(self.messages) * 150
-        if estimated_tokens > self.max_tokens:
-            # Remove oldest messages until under token limit
-            while len(self.messages) > 1 and (len(self.messages) * 150) > self.max_tokens:
-                removed = self.messages.pop(0)
-                logger.debug(f"[MEMORY] Removed message (token limit: {self.max_tokens})")
+        # Token management using the running token count
+        while self._total_tokens > self.max_tokens and len(self.messages) > 1:
+            self._evict_oldest()
+            logger.debug("[MEMORY] Removed message (token limit: %d)", self.max_tokens)
     
     def get_summary_stats(self) -> Dict:
         """Get conversation statistics"""
@@ -206,25 +270,103 @@ class ChatMemory:
         memory.documents_used = set(data.get("documents_used", []))
         
         for msg_data in data.get("messages", []):
-            memory.messages.append(ConversationMessage.from_dict(msg_data))
+            memory._append(ConversationMessage.from_dict(msg_data))
         
         return memory
 
 
+class SessionCache(LRUCache):
+    """LRU cache of chat sessions that hands evicted sessions to a callback"""
+    
+    def __init__(self, maxsize: int, on_evict: Callable[[str, ChatMemory], None]):
+        """
+        Initialize session cache
+        
+        Args:
+            maxsize: Maximum number of sessions kept in memory
+            on_evict: Called with (session_id, memory) when a session is evicted
+        """
+        super().__init__(maxsize=maxsize)
+        self._on_evict = on_evict
+    
+    def popitem(self):
+        """Evict least recently used session and notify the callback"""
+        session_id, memory = super().popitem()
+        self._on_evict(session_id, memory)
+        return session_id, memory
+
+
 class ChatMemoryManager:
     """Manages multiple chat sessions"""
     
-    def __init__(self, storage_path: str = "./storage/chat_sessions"):
+    def __init__(self, storage_path: str = "./storage/chat_sessions", max_sessions: int = 1024):
         """
         Initialize chat memory manager
         
         Args:
-            storage_path: Path to store chat sessions
+            storage_path: Path to store chat sessions (holds the chat.db SQLite store)
+            max_sessions: Maximum number of sessions kept in memory (older ones are paged to disk)
         """
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
-        self.sessions: Dict[str, ChatMemory] = {}
+        self.sessions: SessionCache = SessionCache(max_sessions, on_evict=self._on_session_evicted)
+        self._init_db()
         logger.info(f"[MEMORY MANAGER] Initialized with storage path: {self.storage_path}")
+        self._migrate_json_sessions()
+    
+    def _init_db(self) -> None:
+        """Open the SQLite session store in WAL mode"""
+        self.db_path = self.storage_path / "chat.db"
+        self.db = sqlite3.connect(str(self.db_path), isolation_level=None)
+        self.db.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "CREATE TABLE IF NOT EXISTS sessions("
+            "session_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL"
+            ");"
+        )
+    
+    def _migrate_json_sessions(self) -> None:
+        """One-shot import of sessions saved as JSON files (flat or sharded) into SQLite"""
+        try:
+            migrated = 0
+            for file_path in self.storage_path.rglob("*.json"):
+                data = file_path.read_bytes()
+                # A session may exist both flat and sharded (or already in the DB);
+                # the most recently written copy wins
+                cursor = self.db.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at "
+                    "WHERE excluded.updated_at > sessions.updated_at",
+                    (file_path.stem, data, file_path.stat().st_mtime)
+                )
+                if not cursor.rowcount:
+                    logger.debug("[MEMORY MANAGER] Kept newer stored copy of session %s over %s", file_path.stem, file_path)
+                # Autocommit: the file's data (or a newer copy) is in the DB now
+                file_path.unlink()
+                migrated += 1
+            
+            if migrated:
+                logger.info(f"[MEMORY MANAGER] Migrated {migrated} session files into {self.db_path}")
+        except Exception as e:
+            logger.error(f"[MEMORY MANAGER] Error migrating session files: {e}")
+    
+    def _on_session_evicted(self, session_id: str, memory: ChatMemory) -> None:
+        """Persist a session when it is evicted from the in-memory cache"""
+        if self._write_session(session_id, memory):
+            logger.debug("[MEMORY MANAGER] Evicted session %s to disk", session_id)
+    
+    def _write_session(self, session_id: str, memory: ChatMemory) -> bool:
+        """Write chat session to the SQLite store"""
+        try:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session_id, orjson.dumps(memory.to_dict(), default=str), time.time())
+            )
+            return True
+        except Exception as e:
+            logger.error(f"[MEMORY MANAGER] Error saving session {session_id}: {e}")
+            return False
     
     def create_session(self, session_id: str) -> ChatMemory:
         """Create new chat session"""
@@ -238,50 +380,56 @@ class ChatMemoryManager:
         return memory
     
     def get_session(self, session_id: str) -> Optional[ChatMemory]:
-        """Get existing session"""
-        return self.sessions.get(session_id)
+        """Get existing session, loading it from disk if it is not in memory"""
+        memory = self.sessions.get(session_id)
+        if memory is None:
+            memory = self.load_session(session_id)
+        return memory
     
     def get_or_create_session(self, session_id: str) -> ChatMemory:
         """Get existing session or create new one"""
-        if session_id not in self.sessions:
+        memory = self.get_session(session_id)
+        if memory is None:
             return self.create_session(session_id)
-        return self.sessions[session_id]
+        return memory
     
-    def save_session(self, session_id: str) -> bool:
-        """Save chat session to disk"""
-        try:
-            if session_id not in self.sessions:
-                logger.warning(f"[MEMORY MANAGER] Session {session_id} not found")
-                return False
-            
-            memory = self.sessions[session_id]
-            file_path = self.storage_path / f"{session_id}.json"
-            
-            with open(file_path, 'w') as f:
-                json.dump(memory.to_dict(), f, indent=2, default=str)
-            
-            logger.info(f"[MEMORY MANAGER] Saved session {session_id} to {file_path}")
-            return True
-        except Exception as e:
-            logger.error(f"[MEMORY MANAGER] Error saving session {session_id}: {e}")
+    def save_session(self, memory: ChatMemory) -> bool:
+        """
+        Save chat session to disk
+        
+        Takes the session object rather than its ID: the session may have been
+        evicted (and persisted in an older state) while the caller held it.
+        """
+        session_id = memory.session_id
+        # Put it back in the cache so a later get_session sees this state, not the evicted one
+        self.sessions[session_id] = memory
+        
+        if not self._write_session(session_id, memory):
             return False
+        
+        logger.info(f"[MEMORY MANAGER] Saved session {session_id}")
+        return True
     
     def load_session(self, session_id: str) -> Optional[ChatMemory]:
         """Load chat session from disk"""
+        memory = self._read_session(session_id)
+        if memory is not None:
+            self.sessions[session_id] = memory
+            logger.info(f"[MEMORY MANAGER] Loaded session {session_id}")
+        return memory
+    
+    def _read_session(self, session_id: str) -> Optional[ChatMemory]:
+        """Read chat session from the SQLite store without caching it"""
         try:
-            file_path = self.storage_path / f"{session_id}.json"
+            row = self.db.execute(
+                "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
             
-            if not file_path.exists():
-                logger.warning(f"[MEMORY MANAGER] Session file not found: {file_path}")
+            if row is None:
+                logger.debug("[MEMORY MANAGER] Session not found in store: %s", session_id)
                 return None
             
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
-            memory = ChatMemory.from_dict(data)
-            self.sessions[session_id] = memory
-            logger.info(f"[MEMORY MANAGER] Loaded session {session_id}")
-            return memory
+            return ChatMemory.from_dict(orjson.loads(row[0]))
         except Exception as e:
             logger.error(f"[MEMORY MANAGER] Error loading session {session_id}: {e}")
             return None
@@ -289,13 +437,10 @@ class ChatMemoryManager:
     def delete_session(self, session_id: str) -> bool:
         """Delete chat session"""
         try:
-            file_path = self.storage_path / f"{session_id}.json"
-            
-            if session_id in self.sessions:
-                del self.sessions[session_id]
+            self.sessions.pop(session_id, None)
             
-            if file_path.exists():
-                file_path.unlink()
+            cursor = self.db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            if cursor.rowcount:
                 logger.info(f"[MEMORY MANAGER] Deleted session {session_id}")
             
             return True
@@ -304,12 +449,20 @@ class ChatMemoryManager:
             return False
     
     def get_all_sessions(self) -> List[str]:
-        """Get all session IDs"""
-        return list(self.sessions.keys())
+        """Get all session IDs, in memory or paged out to the SQLite store"""
+        session_ids = dict.fromkeys(self.sessions.keys())
+        try:
+            for (session_id,) in self.db.execute("SELECT session_id FROM sessions"):
+                session_ids[session_id] = None
+        except Exception as e:
+            logger.error(f"[MEMORY MANAGER] Error listing stored sessions: {e}")
+        return list(session_ids)
     
     def get_session_stats(self, session_id: str) -> Optional[Dict]:
-        """Get session statistics"""
-        memory = self.get_session(session_id)
+        """Get session statistics (a paged-out session is read without evicting cached ones)"""
+        memory = self.sessions.get(session_id)
+        if memory is None:
+            memory = self._read_session(session_id)
         if not memory:
             return None
         return memory.get_summary_stats()
@@ -0,0 +1,100 @@
+"""
+Shared Service Instances
+Heavy dependencies (API clients, vector store, models) are created once per
+process and shared by the query and upload services
+"""
+
+import logging
+from functools import lru_cache
+
+from app.embedding.embedding_service import EmbeddingService, VectorStore
+from app.reranking.reranker import QueryReranker
+from app.llm.llm_service import LLMService
+from app.verification.verifier import AnswerVerifier
+from app.safety.content_moderator import ContentModerator
+from app.data_ingest.ingester import DocumentIngester
+from app.pdf_processing.processor import PDFProcessor
+from app.chunking.chunker import TextChunker
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_embedding_service() -> EmbeddingService:
+    """Shared EmbeddingService instance"""
+    return EmbeddingService()
+
+
+@lru_cache(maxsize=None)
+def get_vector_store() -> VectorStore:
+    """Shared VectorStore instance"""
+    return VectorStore()
+
+
+@lru_cache(maxsize=None)
+def get_reranker() -> QueryReranker:
+    """Shared QueryReranker instance"""
+    return QueryReranker()
+
+
+@lru_cache(maxsize=None)
+def get_llm_service() -> LLMService:
+    """Shared LLMService instance"""
+    return LLMService()
+
+
+@lru_cache(maxsize=None)
+def get_answer_verifier() -> AnswerVerifier:
+    """Shared AnswerVerifier instance"""
+    return AnswerVerifier()
+
+
+@lru_cache(maxsize=None)
+def get_content_moderator() -> ContentModerator:
+    """Shared ContentModerator instance"""
+    return ContentModerator()
+
+
+@lru_cache(maxsize=None)
+def get_document_ingester() -> DocumentIngester:
+    """Shared DocumentIngester instance"""
+    return DocumentIngester()
+
+
+@lru_cache(maxsize=None)
+def get_pdf_processor() -> PDFProcessor:
+    """Shared PDFProcessor instance"""
+    return PDFProcessor()
+
+
+@lru_cache(maxsize=None)
+def get_text_chunker() -> TextChunker:
+    """Shared TextChunker instance"""
+    return TextChunker()
+
+
+@lru_cache(maxsize=None)
+def get_query_service():
+    """Shared QueryService instance"""
+    from app.services.query_service import QueryService
+    return QueryService()
+
+
+@lru_cache(maxsize=None)
+def get_upload_service():
+    """Shared UploadService instance"""
+    from app.services.upload_service import UploadService
+    return UploadService()
+
+
+def init_services() -> None:
+    """
+    Create all shared services up front
+
+    Called from the FastAPI lifespan so model loading and client setup happen
+    at startup instead of on the first request.
+    """
+    logger.info("[SERVICES] Initializing shared services...")
+    get_query_service()
+    get_upload_service()
+    logger.info("[SERVICES] Shared services ready")
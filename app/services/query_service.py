@@ -4,32 +4,98 @@ Handles RAG query workflow with 5-step processing pipeline
 Includes chat memory management for multi-turn conversations
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from cachetools import LRUCache
 from fastapi import HTTPException
 
-from app.embedding.embedding_service import EmbeddingService, VectorStore
-from app.reranking.reranker import QueryReranker
-from app.llm.llm_service import LLMService
-from app.verification.verifier import AnswerVerifier
+from app.config.settings import settings
 from app.services.chat_memory import ChatMemory, memory_manager
-from app.safety.content_moderator import ContentModerator
+from app.services.dependencies import (
+    get_embedding_service,
+    get_vector_store,
+    get_reranker,
+    get_llm_service,
+    get_answer_verifier,
+    get_content_moderator,
+)
 from app.schemas.models import SourceEvidence
+from app.services.request_batcher import RequestBatcher
+from app.utils.fast_rank import top_k_indices, topk_cosine
 
 logger = logging.getLogger(__name__)
 
+# Vector store search hit: (chunk_id, distance, metadata)
+SearchResult = Tuple[str, float, Dict]
+
+
+def _chunk_from_result(result: SearchResult) -> Dict:
+    """Build the chunk dict used for answer generation from a search hit"""
+    chunk_id, distance, metadata = result
+    return {
+        "chunk_id": chunk_id,
+        "text": metadata.get("text", ""),
+        "text_preview": metadata.get("text_preview"),
+        "page_number": metadata.get("page_number", 0),
+        "document_id": metadata.get("document_id", ""),
+        "source_document": metadata.get("source_document", ""),
+        "distance": distance,
+        "bbox": metadata.get("bbox", None)
+    }
+
+
+def _snippet(text: str, length: int = 100) -> str:
+    """Return text truncated to length characters, with "..." if it was cut"""
+    return text if len(text) <= length else f"{text[:length]}..."
+
+
+def _build_evidence(chunks: List[Dict]) -> List[SourceEvidence]:
+    """Build source evidence entries for the given context chunks"""
+    return [
+        SourceEvidence(
+            page_number=chunk["page_number"],
+            document=chunk["source_document"],
+            exact_chunk=chunk["text"],
+            bbox=chunk.get("bbox"),
+            chunk_id=chunk["chunk_id"],
+            highlighted=_snippet(chunk["text"])
+        )
+        for chunk in chunks
+    ]
+
 
 class QueryService:
     """Service for RAG query processing"""
     
     def __init__(self):
-        """Initialize query service with dependencies"""
-        self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStore()
-        self.reranker = QueryReranker()
-        self.llm_service = LLMService()
-        self.answer_verifier = AnswerVerifier()
-        self.content_moderator = ContentModerator()
+        """Initialize query service with shared dependencies"""
+        self.embedding_service = get_embedding_service()
+        self.vector_store = get_vector_store()
+        self.reranker = get_reranker()
+        self.llm_service = get_llm_service()
+        self.answer_verifier = get_answer_verifier()
+        self.content_moderator = get_content_moderator()
+        # Query embeddings keyed on normalized query text, stored as float32 arrays
+        self._embedding_cache: LRUCache = LRUCache(maxsize=4096)
+        
+        # Optional server-side batching of concurrent queries
+        self._embedding_batcher: Optional[RequestBatcher] = None
+        self._rerank_batcher: Optional[RequestBatcher] = None
+        if settings.query_batching_enabled:
+            self._embedding_batcher = RequestBatcher(
+                self._embed_batch,
+                max_batch_size=settings.query_batch_max_size,
+                max_wait_ms=settings.query_batch_max_wait_ms,
+                name="EMBED BATCH"
+            )
+            self._rerank_batcher = RequestBatcher(
+                self.reranker.rerank_batch,
+                max_batch_size=settings.query_batch_max_size,
+                max_wait_ms=settings.query_batch_max_wait_ms,
+                name="RERANK BATCH"
+            )
     
     async def process_query(self, user_query: str) -> Dict:
         """
@@ -66,34 +132,46 @@ class QueryService:
             logger.info(f"   Session ID: {session_id}")
         
         # Step 0: Check input for harmful content (Content Moderation)
+        # Step 1 (query embedding) runs concurrently and is discarded if the input is rejected
         logger.info("[0/5] Checking input for policy violations...")
-        is_safe_input, mod_result = await self.content_moderator.check_input(user_query)
-        
-        if not is_safe_input:
-            logger.warning("[MODERATION] ❌ Input rejected due to policy violation")
-            violation_message = self.content_moderator.get_violation_message(mod_result, stage="input")
-            return {
-                "query": user_query,
-                "answer": violation_message,
-                "evidence": [],
-                "confidence_score": 0.0,
-                "tokens_used": 0,
-                "moderation_flagged": True,
-                "moderation_reason": "input_policy_violation"
-            }
-        
-        logger.info("[MODERATION] ✅ Input passed safety check")
-        
-        # Initialize or get chat memory if session_id provided
-        chat_memory: Optional[ChatMemory] = None
-        if session_id:
-            chat_memory = memory_manager.get_or_create_session(session_id)
-            chat_memory.add_user_message(user_query)
-            logger.info(f"[CHAT HISTORY] Added user message to session. Total messages: {len(chat_memory.messages)}")
+        moderation_task = asyncio.create_task(self.content_moderator.check_input(user_query))
+        embedding_task = asyncio.create_task(self._step_embed_query(user_query))
+        # Until the main pipeline awaits embedding_task, any exit (rejection, session error,
+        # cancellation) must cancel and reap it, or a failed embed is never retrieved
+        try:
+            is_safe_input, mod_result = await moderation_task
+            
+            if not is_safe_input:
+                logger.warning("[MODERATION] ❌ Input rejected due to policy violation")
+                embedding_task.cancel()
+                await asyncio.gather(embedding_task, return_exceptions=True)
+                violation_message = self.content_moderator.get_violation_message(mod_result, stage="input")
+                return {
+                    "query": user_query,
+                    "answer": violation_message,
+                    "evidence": [],
+                    "confidence_score": 0.0,
+                    "tokens_used": 0,
+                    "moderation_flagged": True,
+                    "moderation_reason": "input_policy_violation"
+                }
+            
+            logger.info("[MODERATION] ✅ Input passed safety check")
+            
+            # Initialize or get chat memory if session_id provided
+            chat_memory: Optional[ChatMemory] = None
+            if session_id:
+                chat_memory = memory_manager.get_or_create_session(session_id)
+                chat_memory.add_user_message(user_query)
+                logger.info(f"[CHAT HISTORY] Added user message to session. Total messages: {len(chat_memory.messages)}")
+        except BaseException:
+            embedding_task.cancel()
+            await asyncio.gather(embedding_task, return_exceptions=True)
+            raise
         
         try:
-            # Step 1: Generate query embedding
-            query_embedding = await self._step_embed_query(user_query)
+            # Step 1: Generate query embedding (started alongside moderation)
+            query_embedding = await embedding_task
             
             # Step 2: Retrieve relevant chunks
             retrieved_chunks = await self._step_retrieve(user_query, query_embedding)
@@ -110,12 +188,12 @@ class QueryService:
                 
                 if chat_memory:
                     chat_memory.add_assistant_message(response["answer"])
-                    memory_manager.save_session(session_id)
+                    memory_manager.save_session(chat_memory)
                 
                 return response
             
             # Step 3: Rerank results
-            reranked_chunks = await self._step_rerank(user_query, retrieved_chunks)
+            reranked_chunks = await self._step_rerank(user_query, retrieved_chunks, query_embedding)
             
             # Step 4: Generate grounded answer (with optional chat history)
             chat_history_text = None
@@ -129,30 +207,41 @@ class QueryService:
                 chat_history=chat_history_text
             )
             
-            # Step 5: Verify answer
-            verified_result = await self._step_verify_answer(user_query, rag_result)
+            # Step 5: Verify answer, concurrently with output moderation
+            (is_safe_output, mod_result), verified_result = await asyncio.gather(
+                self._step_moderate_output(rag_result.get("answer", "")),
+                self._step_verify_answer(user_query, rag_result, query_embedding)
+            )
+            
+            if not is_safe_output:
+                verified_result["answer"] = self.content_moderator.get_violation_message(mod_result, stage="output")
+                verified_result["moderation_flagged"] = True
+                verified_result["moderation_reason"] = "output_policy_violation"
+            else:
+                verified_result["moderation_flagged"] = False
             
             logger.info("=" * 60)
             logger.info("[SUCCESS] RAG query processed successfully")
             logger.info("=" * 60)
             
-            # Extract page numbers from evidence
-            page_numbers = list(set([chunk.get("page_number") for chunk in rag_result.get("context_chunks", [])]))
-            
-            # Build sources from evidence
+            # Build sources and collect page numbers from evidence in one pass
+            context_chunks = rag_result.get("context_chunks", [])
+            seen_pages = {}
             sources = []
-            for chunk in rag_result.get("context_chunks", []):
+            for chunk in context_chunks:
+                page_number = chunk.get("page_number", 0)
+                seen_pages[page_number] = None
                 sources.append({
                     "document": chunk.get("source_document", "Unknown"),
-                    "page_number": chunk.get("page_number", 0),
+                    "page_number": page_number,
                     "chunk_id": chunk.get("chunk_id", "")
                 })
             
             final_result = {
                 **verified_result,
                 "sources": sources,
-                "page_numbers": sorted(page_numbers),
-                "context_used": len(rag_result.get("context_chunks", []))
+                "page_numbers": sorted(seen_pages),
+                "context_used": len(context_chunks)
             }
             
             # Save to chat memory if session exists
@@ -164,7 +253,7 @@ class QueryService:
                         "confidence_score": verified_result.get("confidence_score", 0)
                     }
                 )
-                memory_manager.save_session(session_id)
+                memory_manager.save_session(chat_memory)
                 logger.info(f"[CHAT HISTORY] Saved response to session {session_id}")
             
             return final_result
@@ -182,7 +271,7 @@ class QueryService:
         logger.info("[1/5] Generating query embedding...")
         
         try:
-            query_embedding = await self.embedding_service.embed_text(user_query)
+            query_embedding = await self._cached_embed(user_query)
             logger.info(f"   [OK] Query embedded: {len(query_embedding)} dimensions")
             logger.debug(f"   Embedding preview: {query_embedding[:3]}...")
             return query_embedding
@@ -190,17 +279,48 @@ class QueryService:
             logger.error(f"   [ERROR] Failed to embed query: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
     
-    async def _step_retrieve(self, user_query: str, query_embedding: List[float]) -> List[Dict]:
+    async def _cached_embed(self, user_query: str) -> List[float]:
+        """Embed query, reusing the embedding of a previously seen (normalized) query"""
+        cache_key = " ".join(user_query.lower().split())
+        cached = self._embedding_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("   Query embedding cache hit")
+            return cached.tolist()
+        
+        query_embedding = await self._embed_text(user_query)
+        if query_embedding:
+            self._embedding_cache[cache_key] = np.asarray(query_embedding, dtype=np.float32)
+        return query_embedding
+    
+    async def _embed_text(self, text: str) -> List[float]:
+        """Embed text, through the embedding batcher when batching is enabled"""
+        if self._embedding_batcher:
+            return await self._embedding_batcher.submit(text)
+        return await self.embedding_service.embed_text(text)
+    
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embedding batcher function; empty texts get [] (as from embed_text) without reaching the API"""
+        results = [[] for _ in texts]
+        keep = [i for i, text in enumerate(texts) if text and text.strip()]
+        if keep:
+            embeddings = await self.embedding_service.embed_texts([texts[i] for i in keep])
+            if len(embeddings) != len(keep):
+                raise ValueError(f"Got {len(embeddings)} embeddings for {len(keep)} texts")
+            for i, row in zip(keep, embeddings):
+                results[i] = row.tolist()
+        return results
+    
+    async def _step_retrieve(self, user_query: str, query_embedding: List[float]) -> List[SearchResult]:
         """Step 2: Retrieve relevant chunks from vector store"""
         logger.info("[2/5] Retrieving relevant chunks...")
         logger.debug(f"[RETRIEVE DEBUG] Query embedding size: {len(query_embedding)}")
         logger.debug(f"[RETRIEVE DEBUG] Vector store backend: {self.vector_store.backend if hasattr(self.vector_store, 'backend') else 'unknown'}")
         
         try:
-            # Check collection before search
-            if hasattr(self.vector_store, 'collection') and self.vector_store.collection:
+            # Check collection before search (count() is a store round trip, so only when debugging)
+            if logger.isEnabledFor(logging.DEBUG) and getattr(self.vector_store, 'collection', None):
                 try:
-                    collection_count = self.vector_store.collection.count()
+                    collection_count = await self.vector_store.count_async()
                     logger.debug(f"[RETRIEVE DEBUG] Collection has {collection_count} total vectors")
                 except Exception as e:
                     logger.debug(f"[RETRIEVE DEBUG] Could not get collection count: {e}")
@@ -217,61 +337,89 @@ class QueryService:
             
             logger.info(f"   [OK] Retrieved {len(search_results)} chunks")
             
-            # Extract and format results
-            # Results are tuples: (chunk_id, similarity_score, metadata)
-            retrieved_chunks = []
-            for i, (chunk_id, similarity, metadata) in enumerate(search_results):
-                chunk_data = {
-                    "chunk_id": chunk_id,
-                    "text": metadata.get("text", ""),
-                    "page_number": metadata.get("page_number", 0),
-                    "document_id": metadata.get("document_id", ""),
-                    "source_document": metadata.get("source_document", ""),
-                    "distance": similarity,
-                    "bbox": metadata.get("bbox", None)
-                }
-                retrieved_chunks.append(chunk_data)
-                logger.debug(f"   [{i+1}] Chunk: {chunk_id} (Distance: {similarity:.4f}, Page: {chunk_data['page_number']}, Doc: {chunk_data['document_id']})")
-            
-            logger.info(f"[RETRIEVE SUCCESS] Formatted {len(retrieved_chunks)} chunks for processing")
-            return retrieved_chunks
+            # Results stay as (chunk_id, distance, metadata) tuples; chunk dicts are
+            # only built in _step_rerank for the chunks that survive it
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, (chunk_id, similarity, metadata) in enumerate(search_results):
+                    logger.debug(
+                        "   [%d] Chunk: %s (Distance: %.4f, Page: %s, Doc: %s)",
+                        i + 1, chunk_id, similarity,
+                        metadata.get("page_number", 0), metadata.get("document_id", "")
+                    )
+            
+            return search_results
         except Exception as e:
             logger.error(f"   [ERROR] Failed to retrieve chunks: {str(e)}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
     
-    async def _step_rerank(self, user_query: str, retrieved_chunks: List[Dict]) -> List[Dict]:
+    async def _step_rerank(
+        self,
+        user_query: str,
+        retrieved_chunks: List[SearchResult],
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
         """Step 3: Rerank retrieved chunks"""
         logger.info("[3/5] Reranking results...")
         
         try:
-            chunk_texts = [chunk["text"] for chunk in retrieved_chunks]
-            rerank_scores = await self.reranker.rerank(user_query, chunk_texts)
+            chunk_texts = [metadata.get("text", "") for _, _, metadata in retrieved_chunks]
+            if self._rerank_batcher:
+                rerank_scores = await self._rerank_batcher.submit((user_query, chunk_texts))
+            else:
+                rerank_scores = await self.reranker.rerank(user_query, chunk_texts)
             
-            if not rerank_scores or len(rerank_scores) == 0:
+            if rerank_scores is None:
+                logger.warning("   [WARNING] Reranker unavailable")
+                return await self._cosine_fallback(retrieved_chunks, query_embedding)
+            
+            if len(rerank_scores) == 0:
                 logger.warning("   [WARNING] Reranking returned no scores")
-                return retrieved_chunks
+                return [_chunk_from_result(result) for result in retrieved_chunks]
             
             logger.info(f"   [OK] Reranked {len(rerank_scores)} results")
             
-            # Add rerank scores to chunks
-            for i, chunk in enumerate(retrieved_chunks):
-                if i < len(rerank_scores):
-                    chunk["rerank_score"] = rerank_scores[i]
-                    logger.debug(f"   [{i+1}] Rerank score: {rerank_scores[i]:.4f}")
-            
-            # Sort by rerank score (descending)
-            reranked = sorted(retrieved_chunks, key=lambda x: x.get("rerank_score", 0), reverse=True)
-            
-            # Keep top 5
-            top_chunks = reranked[:5]
+            # Chunks without a score rank as 0
+            scores = np.zeros(len(retrieved_chunks), dtype=np.float32)
+            n_scored = min(len(rerank_scores), len(retrieved_chunks))
+            scores[:n_scored] = rerank_scores[:n_scored]
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                for i in range(n_scored):
+                    logger.debug("   [%d] Rerank score: %.4f", i + 1, scores[i])
+            
+            # Keep top 5 by rerank score (descending, ties keep retrieval order)
+            top_chunks = []
+            for i in top_k_indices(scores, 5):
+                chunk = _chunk_from_result(retrieved_chunks[i])
+                if i < n_scored:
+                    chunk["rerank_score"] = float(scores[i])
+                top_chunks.append(chunk)
             logger.info(f"   [OK] Selected top {len(top_chunks)} chunks for answer generation")
             
             return top_chunks
         except Exception as e:
             logger.error(f"   [ERROR] Failed to rerank: {str(e)}")
-            # Continue with original order if reranking fails
+            return await self._cosine_fallback(retrieved_chunks, query_embedding)
+    
+    async def _cosine_fallback(
+        self,
+        retrieved_chunks: List[SearchResult],
+        query_embedding: Optional[List[float]]
+    ) -> List[Dict]:
+        """Rank chunks by exact cosine similarity to the query when the reranker is unavailable or fails"""
+        try:
+            if query_embedding is None:
+                raise ValueError("no query embedding")
+            chunk_ids = [chunk_id for chunk_id, _, _ in retrieved_chunks]
+            chunk_embeddings = await self.vector_store.get_embeddings(chunk_ids)
+            top_idx, _ = topk_cosine(query_embedding, chunk_embeddings, 5)
+            logger.warning("   [WARNING] Proceeding with cosine similarity order")
+            return [_chunk_from_result(retrieved_chunks[i]) for i in top_idx]
+        except Exception as e:
+            logger.debug(f"   Cosine fallback unavailable: {str(e)}")
+            # Continue with original order if stored embeddings cannot be fetched
             logger.warning("   [WARNING] Proceeding with original retrieval order")
-            return retrieved_chunks[:5]
+            return [_chunk_from_result(result) for result in retrieved_chunks[:5]]
     
     async def _step_generate_answer(
         self,
@@ -293,21 +441,6 @@ class QueryService:
             logger.info(f"   [OK] Answer generated")
             logger.debug(f"   Answer length: {len(rag_result.get('answer', ''))} characters")
             
-            # Check output for harmful content (Content Moderation)
-            logger.info("[OUTPUT MODERATION] Checking answer for policy violations...")
-            answer_text = rag_result.get('answer', '')
-            is_safe_output, mod_result = await self.content_moderator.check_output(answer_text)
-            
-            if not is_safe_output:
-                logger.warning("[MODERATION] ❌ Output flagged for policy violation")
-                violation_message = self.content_moderator.get_violation_message(mod_result, stage="output")
-                rag_result["answer"] = violation_message
-                rag_result["moderation_flagged"] = True
-                rag_result["moderation_reason"] = "output_policy_violation"
-            else:
-                logger.info("[OUTPUT MODERATION] ✅ Answer passed safety check")
-                rag_result["moderation_flagged"] = False
-            
             # Add context chunks to result
             rag_result["context_chunks"] = context_chunks
             
@@ -316,7 +449,24 @@ class QueryService:
             logger.error(f"   [ERROR] Failed to generate answer: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Answer generation failed: {str(e)}")
     
-    async def _step_verify_answer(self, user_query: str, rag_result: Dict) -> Dict:
+    async def _step_moderate_output(self, answer_text: str) -> Tuple[bool, Dict]:
+        """Check generated answer for harmful content (Content Moderation)"""
+        logger.info("[OUTPUT MODERATION] Checking answer for policy violations...")
+        is_safe_output, mod_result = await self.content_moderator.check_output(answer_text)
+        
+        if not is_safe_output:
+            logger.warning("[MODERATION] ❌ Output flagged for policy violation")
+        else:
+            logger.info("[OUTPUT MODERATION] ✅ Answer passed safety check")
+        
+        return is_safe_output, mod_result
+    
+    async def _step_verify_answer(
+        self,
+        user_query: str,
+        rag_result: Dict,
+        query_embedding: Optional[List[float]] = None
+    ) -> Dict:
         """Step 5: Verify answer against context"""
         logger.info("[5/5] Verifying answer...")
         
@@ -327,29 +477,19 @@ class QueryService:
             verification = await self.answer_verifier.verify_answer(
                 answer,
                 context_chunks,
-                user_query
+                user_query,
+                query_embedding,
+                answer_embedder=self._embed_text
             )
             
             logger.info(f"   [OK] Verification complete")
             logger.debug(f"   Is grounded: {verification.get('is_grounded', False)}")
             logger.debug(f"   Confidence: {verification.get('confidence_score', 0):.2f}")
             
-            # Build evidence
-            evidence = []
-            for chunk in context_chunks:
-                evidence.append(SourceEvidence(
-                    page_number=chunk["page_number"],
-                    document=chunk["source_document"],
-                    exact_chunk=chunk["text"],
-                    bbox=chunk.get("bbox"),
-                    chunk_id=chunk["chunk_id"],
-                    highlighted=chunk["text"][:100] + "..." if len(chunk["text"]) > 100 else chunk["text"]
-                ))
-            
             return {
                 "query": user_query,
                 "answer": answer,
-                "evidence": evidence,
+                "evidence": _build_evidence(context_chunks),
                 "confidence_score": verification.get("confidence_score", 0),
                 "tokens_used": rag_result.get("tokens_used", 0)
             }
@@ -358,21 +498,10 @@ class QueryService:
             # Return answer even if verification fails
             logger.warning("   [WARNING] Returning unverified answer")
             
-            evidence = []
-            for chunk in rag_result.get("context_chunks", []):
-                evidence.append(SourceEvidence(
-                    page_number=chunk["page_number"],
-                    document=chunk["source_document"],
-                    exact_chunk=chunk["text"],
-                    bbox=chunk.get("bbox"),
-                    chunk_id=chunk["chunk_id"],
-                    highlighted=chunk["text"][:100] + "..." if len(chunk["text"]) > 100 else chunk["text"]
-                ))
-            
             return {
                 "query": user_query,
                 "answer": rag_result.get("answer", ""),
-                "evidence": evidence,
+                "evidence": _build_evidence(rag_result.get("context_chunks", [])),
                 "confidence_score": 0.0,
                 "tokens_used": rag_result.get("tokens_used", 0)
             }
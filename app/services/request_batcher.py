@@ -0,0 +1,118 @@
+"""
+Request Batching
+Coalesces concurrent requests into batched calls to amortize per-call overhead
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RequestBatcher:
+    """Collects concurrently submitted items and processes them in batches"""
+    
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: int = 50,
+        max_concurrency: int = 4,
+        name: str = "batcher"
+    ):
+        """
+        Initialize request batcher
+        
+        Args:
+            batch_fn: Coroutine function taking a list of items and returning one result per item
+            max_batch_size: Dispatch as soon as this many items are queued
+            max_wait_ms: Maximum time to wait for more items after the first one arrives
+            max_concurrency: Maximum batches in flight at once
+            name: Name used in log messages
+        """
+        self._batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit an item and wait for its result from the next batch
+        
+        Args:
+            item: Item to process
+        
+        Returns:
+            Result for this item
+        """
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+    
+    async def _run(self) -> None:
+        """Background loop that drains the queue into batches"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Dispatch in the background so the next batch can form while this one runs;
+            # waiting for a slot bounds the batches in flight
+            await self._slots.acquire()
+            task = loop.create_task(self._dispatch_and_release(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch_and_release(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Dispatch a batch, then free its concurrency slot"""
+        try:
+            await self._dispatch(batch)
+        finally:
+            self._slots.release()
+    
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Run the batch function and resolve each waiting future with its result"""
+        items = [item for item, _ in batch]
+        logger.debug("[%s] Dispatching batch of %d", self.name, len(items))
+        
+        try:
+            results = await self._batch_fn(items)
+            if len(results) != len(items):
+                raise ValueError(f"{self.name}: got {len(results)} results for {len(items)} items")
+        except Exception as e:
+            if len(batch) > 1:
+                # Retry items one by one so a bad item only fails its own request
+                logger.warning(f"[{self.name}] Batch of {len(batch)} failed ({str(e)}), retrying items singly")
+                await asyncio.gather(*(self._dispatch([entry]) for entry in batch))
+                return
+            logger.error(f"[{self.name}] Batch failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
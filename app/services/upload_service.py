@@ -3,35 +3,54 @@ Upload Service Layer
 Handles document upload workflow with 5-step processing pipeline
 """
 
+import asyncio
+import hashlib
 import tempfile
 import logging
+import numpy as np
 from pathlib import Path
 from fastapi import HTTPException
 from typing import Dict
 
 from app.utils.helpers import generate_id
-from app.data_ingest.ingester import DocumentIngester
-from app.pdf_processing.processor import PDFProcessor
-from app.chunking.chunker import TextChunker
-from app.embedding.embedding_service import EmbeddingService, VectorStore
+from app.services.dependencies import (
+    get_document_ingester,
+    get_pdf_processor,
+    get_text_chunker,
+    get_embedding_service,
+    get_vector_store,
+)
 
 logger = logging.getLogger(__name__)
 
+# Read size when streaming uploads to disk (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Chunks per embedding request and max embedding requests in flight during upload
+EMBED_BATCH_SIZE = 64
+EMBED_CONCURRENCY = 4
+# Embed-and-store tasks (each holding its chunk batch) allowed in flight while parsing
+MAX_PENDING_EMBED_TASKS = EMBED_CONCURRENCY * 2
+
+# Vectors per add_vectors call and max store calls in flight
+STORE_BATCH_SIZE = 512
+STORE_CONCURRENCY = 4
+
 
 class UploadService:
     """Service for document upload and processing"""
     
     def __init__(self):
-        """Initialize upload service with dependencies"""
-        self.document_ingester = DocumentIngester()
-        self.pdf_processor = PDFProcessor()
-        self.text_chunker = TextChunker()
-        self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStore()
+        """Initialize upload service with shared dependencies"""
+        self.document_ingester = get_document_ingester()
+        self.pdf_processor = get_pdf_processor()
+        self.text_chunker = get_text_chunker()
+        self.embedding_service = get_embedding_service()
+        self.vector_store = get_vector_store()
     
     async def process_upload(self, file) -> Dict:
         """
-        Process document upload with 5-step pipeline
+        Process document upload with 5-step pipeline (steps 2-5 are overlapped)
         
         Args:
             file: UploadFile object
@@ -44,16 +63,22 @@ class UploadService:
         logger.info(f"   File: {file.filename}")
         logger.info(f"   Size: {file.size} bytes")
         
-        # Generate document ID
-        document_id = generate_id("doc")
-        logger.info(f"   Document ID: {document_id}")
+        # Human-readable ID for this upload attempt
+        upload_id = generate_id("upload")
         
-        # Save uploaded file temporarily
+        # Save uploaded file temporarily (streamed in chunks to keep memory flat),
+        # hashing the content as it is written
+        content_digest = hashlib.blake2b(digest_size=16)
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            contents = await file.read()
-            tmp.write(contents)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                content_digest.update(chunk)
+                tmp.write(chunk)
             tmp_path = tmp.name
         
+        # Document ID is derived from content so re-uploads of the same file are detected
+        content_hash = content_digest.hexdigest()
+        document_id = f"doc_{content_hash[:16]}"
+        logger.info(f"   Document ID: {document_id} (upload {upload_id})")
         logger.debug(f"   Temp file: {tmp_path}")
         
         try:
@@ -63,37 +88,25 @@ class UploadService:
             # Step 1: Ingest document
             ingest_result = await self._step_ingest(tmp_path, file.filename, document_id)
             
-            # Step 2: Process PDF
-            pdf_result = await self._step_process_pdf(
+            # Steps 2-5: Process PDF, chunk, embed and store as a streaming pipeline
+            pipeline_result = await self._step_pipeline(
                 ingest_result["storage_path"],
                 document_id,
                 file.filename
             )
             
-            # Step 3: Chunk content
-            chunks = await self._step_chunk(
-                pdf_result["pages_content"],
-                document_id,
-                file.filename
-            )
-            
-            if len(chunks) == 0:
+            if pipeline_result["total_chunks"] == 0:
                 logger.warning("   [WARNING] No chunks created")
                 return {
                     "success": True,
                     "document_id": document_id,
+                    "upload_id": upload_id,
                     "document_name": file.filename,
                     "storage_path": ingest_result["storage_path"],
-                    "pdf_type": pdf_result["pdf_type"],
+                    "pdf_type": pipeline_result["pdf_type"],
                     "total_chunks": 0
                 }
             
-            # Step 4: Generate embeddings
-            embeddings = await self._step_embed(chunks)
-            
-            # Step 5: Store vectors
-            store_result = await self._step_store(chunks, embeddings)
-            
             logger.info("=" * 60)
             logger.info(f"[SUCCESS] Document uploaded and persisted: {document_id}")
             logger.info("=" * 60)
@@ -101,10 +114,11 @@ class UploadService:
             return {
                 "success": True,
                 "document_id": document_id,
+                "upload_id": upload_id,
                 "document_name": file.filename,
                 "storage_path": ingest_result["storage_path"],
-                "pdf_type": pdf_result["pdf_type"],
-                "total_chunks": len(chunks)
+                "pdf_type": pipeline_result["pdf_type"],
+                "total_chunks": pipeline_result["total_chunks"]
             }
             
         except HTTPException:
@@ -118,7 +132,7 @@ class UploadService:
     async def _check_duplicate(self, document_id: str, filename: str):
         """Check if document already exists"""
         logger.info("[DUPLICATE CHECK] Checking if document already exists...")
-        if self.vector_store.check_document_exists(document_id):
+        if await self.vector_store.check_document_exists(document_id):
             logger.warning(f"   [WARNING] Document already uploaded: {document_id}")
             raise HTTPException(
                 status_code=400,
@@ -142,21 +156,89 @@ class UploadService:
         logger.info(f"   [OK] Document ingested: {ingest_result['storage_path']}")
         return ingest_result
     
-    async def _step_process_pdf(self, storage_path: str, document_id: str = None, filename: str = None) -> Dict:
-        """Step 2: Process PDF"""
+    async def _step_pipeline(self, storage_path: str, document_id: str, filename: str) -> Dict:
+        """
+        Steps 2-5: Process PDF, chunk, embed and store, overlapping the stages
+        
+        Pages are parsed in batches; their chunks are grouped into batches of
+        EMBED_BATCH_SIZE and each group is embedded and stored in a background task
+        (at most EMBED_CONCURRENCY at a time) while later pages are still being parsed.
+        Parsing waits for the oldest task once MAX_PENDING_EMBED_TASKS are in flight,
+        so only a bounded number of chunk batches is held in memory.
+        If any step fails, vectors already stored for the document are deleted.
+        """
         logger.info("[2/5] Processing PDF...")
-        pdf_result = await self.pdf_processor.process_pdf(
-            Path(storage_path),
+        pdf_path = Path(storage_path)
+        pdf_type = await self.pdf_processor.detect_pdf_type(pdf_path)
+        logger.info(f"[PDF PROCESSING] Processing {pdf_path.name} as {pdf_type.value.upper()}")
+        
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+        tasks = []
+        stored_any = False
+        pending_chunks = []
+        total_pages = 0
+        total_chunks = 0
+        
+        async def embed_and_store(chunk_batch) -> None:
+            async with semaphore:
+                embeddings = await self._step_embed(chunk_batch)
+                await self._step_store(chunk_batch, embeddings)
+        
+        pages = self.pdf_processor.iter_pages(
+            pdf_path,
+            pdf_type,
             document_id=document_id,
             filename=filename
         )
+        try:
+            while True:
+                try:
+                    pages_content = await pages.__anext__()
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    # Corrupt or encrypted PDFs fail here; that is the client's file, not a server error
+                    logger.error(f"   [ERROR] PDF processing failed: {str(e)}")
+                    raise HTTPException(status_code=400, detail=f"PDF processing failed: {str(e)}")
+                
+                total_pages += len(pages_content)
+                chunks = await self._step_chunk(pages_content, document_id, filename)
+                total_chunks += len(chunks)
+                pending_chunks.extend(chunks)
+                
+                while len(pending_chunks) >= EMBED_BATCH_SIZE:
+                    chunk_batch = pending_chunks[:EMBED_BATCH_SIZE]
+                    pending_chunks = pending_chunks[EMBED_BATCH_SIZE:]
+                    if len(tasks) >= MAX_PENDING_EMBED_TASKS:
+                        await tasks.pop(0)
+                    tasks.append(asyncio.create_task(embed_and_store(chunk_batch)))
+                    stored_any = True
+            
+            if pending_chunks:
+                tasks.append(asyncio.create_task(embed_and_store(pending_chunks)))
+                stored_any = True
+            
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled stores settle, then remove the batches that already
+            # landed so a retry of this file is not rejected as a duplicate
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if stored_any:
+                logger.warning(f"   [CLEANUP] Removing partially stored vectors of {document_id}")
+                await self.vector_store.delete_document(document_id)
+            raise
+        finally:
+            # Closes the PDF if parsing stopped early
+            await pages.aclose()
         
-        if not pdf_result["success"]:
-            logger.error(f"   [ERROR] PDF processing failed: {pdf_result.get('error', 'Unknown error')}")
-            raise HTTPException(status_code=400, detail=pdf_result["error"])
-        
-        logger.info(f"   [OK] PDF processed: Type={pdf_result.get('pdf_type', 'N/A')}, Pages={len(pdf_result.get('pages_content', []))}")
-        return pdf_result
+        logger.info(f"   [OK] PDF processed: Type={pdf_type.value}, Pages={total_pages}, Chunks={total_chunks}")
+        return {
+            "pdf_type": pdf_type.value,
+            "total_pages": total_pages,
+            "total_chunks": total_chunks
+        }
     
     async def _step_chunk(self, pages_content, document_id: str, filename: str) -> list:
         """Step 3: Chunk content"""
@@ -169,7 +251,7 @@ class UploadService:
         logger.info(f"   [OK] Created {len(chunks)} chunks")
         return chunks
     
-    async def _step_embed(self, chunks) -> list:
+    async def _step_embed(self, chunks) -> np.ndarray:
         """Step 4: Generate embeddings"""
         logger.info("[4/5] Generating embeddings...")
         chunk_texts = [chunk.text for chunk in chunks]
@@ -186,17 +268,22 @@ class UploadService:
             logger.error(f"   [ERROR] Embedding count ({len(embeddings)}) != Chunk count ({len(chunks)})")
             raise HTTPException(status_code=500, detail=f"Embedding mismatch: {len(embeddings)} vs {len(chunks)}")
         
-        # Validate embeddings
-        for i, emb in enumerate(embeddings):
-            if len(emb) != 1536:
-                logger.error(f"   [ERROR] Embedding {i} has wrong dimension: {len(emb)} (expected 1536)")
-                raise HTTPException(status_code=500, detail=f"Invalid embedding dimension at index {i}")
+        # Validate embeddings (stacked once; also the layout the vector store works with)
+        try:
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+        except ValueError:
+            logger.error("   [ERROR] Embeddings have inconsistent dimensions")
+            raise HTTPException(status_code=500, detail="Invalid embedding dimensions")
+        
+        if embeddings.ndim != 2 or embeddings.shape[1] != 1536:
+            logger.error(f"   [ERROR] Embeddings have wrong shape: {embeddings.shape} (expected (n, 1536))")
+            raise HTTPException(status_code=500, detail=f"Invalid embedding shape {embeddings.shape}")
         
-        logger.debug(f"   Embedding dimensions: {len(embeddings[0])} (expected 1536)")
+        logger.debug(f"   Embedding dimensions: {embeddings.shape[1]} (expected 1536)")
         return embeddings
     
     async def _step_store(self, chunks, embeddings) -> Dict:
-        """Step 5: Store vectors in ChromaDB"""
+        """Step 5: Store vectors in ChromaDB (in sub-batches of STORE_BATCH_SIZE)"""
         logger.info("[5/5] Storing vectors in ChromaDB...")
         chunk_ids = [chunk.chunk_id for chunk in chunks]
         metadata = [chunk.to_dict() for chunk in chunks]
@@ -204,11 +291,30 @@ class UploadService:
         logger.debug(f"   Chunk IDs: {len(chunk_ids)}")
         logger.debug(f"   Metadata: {len(metadata)}")
         
-        store_result = await self.vector_store.add_vectors(chunk_ids, embeddings, metadata)
+        semaphore = asyncio.Semaphore(STORE_CONCURRENCY)
+        
+        async def store_batch(start: int) -> Dict:
+            end = start + STORE_BATCH_SIZE
+            async with semaphore:
+                return await self.vector_store.add_vectors(
+                    chunk_ids[start:end],
+                    embeddings[start:end],
+                    metadata[start:end]
+                )
+        
+        batch_results = await asyncio.gather(
+            *(store_batch(start) for start in range(0, len(chunk_ids), STORE_BATCH_SIZE))
+        )
         
-        if not store_result.get("success"):
-            logger.error(f"   [ERROR] Vector storage failed: {store_result.get('error', 'Unknown error')}")
-            raise HTTPException(status_code=500, detail=f"Vector storage error: {store_result.get('error', 'Unknown')}")
+        for batch_result in batch_results:
+            if not batch_result.get("success"):
+                logger.error(f"   [ERROR] Vector storage failed: {batch_result.get('error', 'Unknown error')}")
+                raise HTTPException(status_code=500, detail=f"Vector storage error: {batch_result.get('error', 'Unknown')}")
         
-        logger.info(f"   [OK] Vectors stored: {store_result.get('added', 0)} vectors in {store_result.get('backend', 'N/A')}")
+        store_result = {
+            "success": True,
+            "added": sum(r.get("added", 0) for r in batch_results),
+            "backend": batch_results[0].get("backend") if batch_results else self.vector_store.backend
+        }
+        logger.info(f"   [OK] Vectors stored: {store_result['added']} vectors in {store_result.get('backend', 'N/A')}")
         return store_result
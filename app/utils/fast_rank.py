@@ -0,0 +1,72 @@
+"""
+Fast Ranking Helpers
+Cosine scoring and top-k selection over embedding matrices
+Uses a numba kernel for scoring when numba is installed, NumPy otherwise
+"""
+
+from typing import Tuple
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        n, d = matrix.shape
+        scores = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            s = 0.0
+            for j in range(d):
+                s += query[j] * matrix[i, j]
+            scores[i] = s
+        return scores
+else:
+    def _dot_scores(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        return matrix @ query
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first (ties keep original order)
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of indices to return
+
+    Returns:
+        Array of at most k indices into scores
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top_idx = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(k)
+    return top_idx[np.lexsort((top_idx, -scores[top_idx]))]
+
+
+def topk_cosine(query, matrix, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rank matrix rows by cosine similarity to the query
+
+    Args:
+        query: Query vector (d,)
+        matrix: Candidate vectors (n, d)
+        k: Number of results to return
+
+    Returns:
+        Tuple of (top k row indices best first, cosine scores for all rows)
+    """
+    query = np.asarray(query, dtype=np.float32)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+
+    query_norm = np.linalg.norm(query)
+    row_norms = np.linalg.norm(matrix, axis=1)
+    row_norms[row_norms == 0] = 1.0
+    query = query / (query_norm or 1.0)
+    matrix = matrix / row_norms[:, None]
+
+    scores = _dot_scores(query, matrix)
+    return top_k_indices(scores, k), scores
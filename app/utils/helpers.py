@@ -3,15 +3,36 @@ Utility Functions
 Common utilities for logging, ID generation, and file handling
 """
 
-import uuid
+import atexit
+import base64
+import itertools
 import logging
+import logging.handlers
 import os
+import queue
+import time
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
 
 from app.config.settings import settings
 
 
+# Per-process sequence number so IDs generated within the same second stay ordered and distinct
+_id_counter = itertools.count()
+
+# Timestamp string is only reformatted when the second changes
+_id_timestamp = (0, "")
+
+
+def _utc_timestamp() -> str:
+    """Return the current UTC time as YYYYmmddHHMMSS, cached per second"""
+    global _id_timestamp
+    now = int(time.time())
+    if _id_timestamp[0] != now:
+        _id_timestamp = (now, time.strftime("%Y%m%d%H%M%S", time.gmtime(now)))
+    return _id_timestamp[1]
+
+
 def generate_id(prefix: str = "") -> str:
     """
     Generate unique ID
@@ -22,34 +43,37 @@ def generate_id(prefix: str = "") -> str:
     Returns:
         Unique identifier string
     """
-    unique_part = str(uuid.uuid4())[:8]
-    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    unique_part = base64.b32encode(os.urandom(5)).decode("ascii").lower()
+    core = f"{_utc_timestamp()}_{next(_id_counter):x}_{unique_part}"
     
     if prefix:
-        return f"{prefix}_{timestamp}_{unique_part}"
-    return f"{timestamp}_{unique_part}"
+        return f"{prefix}_{core}"
+    return core
 
 
-def setup_logging(name: str) -> logging.Logger:
-    """
-    Setup logging configuration
+# Days of rotated log files kept by the file handler
+LOG_BACKUP_DAYS = 7
+
+# Shared handler that enqueues records; a single listener thread does the file/console writes
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _get_queue_handler() -> logging.handlers.QueueHandler:
+    """Create the shared queue handler and start its listener on first use"""
+    global _queue_handler, _queue_listener
+    if _queue_handler is not None:
+        return _queue_handler
     
-    Args:
-        name: Logger name
-        
-    Returns:
-        Configured logger instance
-    """
     log_path = Path(settings.log_path)
     log_path.mkdir(parents=True, exist_ok=True)
     
-    logger = logging.getLogger(name)
-    # Set to DEBUG to see all messages
-    logger.setLevel(logging.DEBUG)
-    
-    # File handler
-    file_handler = logging.FileHandler(
-        log_path / f"app_{datetime.utcnow().strftime('%Y%m%d')}.log"
+    # File handler - rolls over at UTC midnight, keeping LOG_BACKUP_DAYS old files
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        log_path / "app.log",
+        when="midnight",
+        utc=True,
+        backupCount=LOG_BACKUP_DAYS
     )
     file_handler.setLevel(logging.DEBUG)
     
@@ -64,8 +88,37 @@ def setup_logging(name: str) -> logging.Logger:
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue = queue.Queue(-1)
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+    atexit.register(_queue_listener.stop)
+    
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    return _queue_handler
+
+
+def setup_logging(name: str) -> logging.Logger:
+    """
+    Setup logging configuration
+    
+    Safe to call repeatedly: a logger is only configured once. Records are
+    handed to a background listener so callers never block on log I/O.
+    
+    Args:
+        name: Logger name
+        
+    Returns:
+        Configured logger instance
+    """
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    
+    # Set to DEBUG to see all messages
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(_get_queue_handler())
     
     return logger
 
@@ -89,16 +142,24 @@ def cleanup_old_logs(days: int = 7) -> None:
     """
     Clean up log files older than specified days
     
+    Rotated app.log files are pruned by the file handler itself; this removes
+    the per-day app_YYYYMMDD.log files written by earlier versions.
+    
     Args:
         days: Number of days to keep logs
     """
     try:
-        log_path = Path(settings.log_path)
-        cutoff_time = datetime.utcnow().timestamp() - (days * 86400)
+        cutoff_time = time.time() - (days * 86400)
         
-        for log_file in log_path.glob("app_*.log"):
-            if log_file.stat().st_mtime < cutoff_time:
-                log_file.unlink()
+        # DirEntry.stat() reuses data from the directory scan where the OS provides it
+        with os.scandir(settings.log_path) as entries:
+            for entry in entries:
+                if (
+                    entry.name.startswith("app_")
+                    and entry.name.endswith(".log")
+                    and entry.stat().st_mtime < cutoff_time
+                ):
+                    os.unlink(entry.path)
                 
     except Exception as e:
         logging.error(f"Error cleaning up logs: {str(e)}")
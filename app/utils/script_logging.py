@@ -0,0 +1,43 @@
+"""
+Script Logging
+Block-buffered stdout logging for the command-line test and setup scripts
+"""
+
+import io
+import logging
+import sys
+
+
+class _BlockBufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler that leaves flushing to the stream's buffer instead of flushing every record"""
+
+    def flush(self) -> None:
+        # Records go out when the buffer fills and when the handler is closed
+        pass
+
+    def close(self) -> None:
+        """Flush what is buffered, then close the handler"""
+        try:
+            self.stream.flush()
+        finally:
+            super().close()
+
+
+def setup_script_logging(fmt: str = "%(message)s", level: int = logging.INFO) -> None:
+    """
+    Send root logging to a block-buffered stdout
+
+    Output is written in buffer-sized blocks instead of one write per line;
+    logging.shutdown (run at interpreter exit) flushes the rest.
+
+    Args:
+        fmt: Log record format
+        level: Root log level
+    """
+    stream = io.TextIOWrapper(
+        sys.stdout.buffer,
+        encoding=sys.stdout.encoding,
+        errors="replace",
+        line_buffering=False
+    )
+    logging.basicConfig(level=level, format=fmt, handlers=[_BlockBufferedStreamHandler(stream)])
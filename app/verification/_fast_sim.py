@@ -0,0 +1,212 @@
+"""
+Fast String Similarity
+Bit-parallel InDel similarity (full and partial), used by the verifier when rapidfuzz is not installed
+Uses a numba kernel when numba is available, Python integers otherwise
+"""
+
+from typing import Dict
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _lcs_length_py(a: str, b: str) -> int:
+    """
+    Length of the longest common subsequence of a and b (len(a) >= len(b))
+
+    Hyyrö's bit-parallel algorithm with one bit per character of a. Python
+    integers hold the whole bit vector, so each step updates all of a at once.
+    """
+    match_masks: Dict[str, int] = {}
+    for i, ch in enumerate(a):
+        match_masks[ch] = match_masks.get(ch, 0) | (1 << i)
+
+    full = (1 << len(a)) - 1
+    v = full
+    for ch in b:
+        mask = match_masks.get(ch)
+        if mask is None:
+            continue
+        u = v & mask
+        v = ((v + u) | (v & ~u)) & full
+
+    # Every zero bit in v is one matched character
+    return len(a) - bin(v).count("1")
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _lcs_kernel(a_idx: np.ndarray, b_idx: np.ndarray, n_symbols: int) -> int:
+        n = a_idx.shape[0]
+        n_words = (n + 63) // 64
+
+        # Bit i of match_masks[c] is set when a[i] is symbol c
+        match_masks = np.zeros((n_symbols, n_words), dtype=np.uint64)
+        for i in range(n):
+            match_masks[a_idx[i], i >> 6] |= np.uint64(1) << np.uint64(i & 63)
+
+        v = np.full(n_words, np.uint64(0xFFFFFFFFFFFFFFFF), dtype=np.uint64)
+        tail_bits = n & 63
+        last_mask = np.uint64(0xFFFFFFFFFFFFFFFF)
+        if tail_bits:
+            last_mask = (np.uint64(1) << np.uint64(tail_bits)) - np.uint64(1)
+        v[n_words - 1] &= last_mask
+
+        for k in b_idx:
+            if k < 0:
+                continue
+            carry = np.uint64(0)
+            for w in range(n_words):
+                vw = v[w]
+                u = vw & match_masks[k, w]
+                s = vw + u
+                s_carry = s + carry
+                carry = np.uint64(1) if (s < vw or s_carry < s) else np.uint64(0)
+                v[w] = s_carry | (vw & ~u)
+            v[n_words - 1] &= last_mask
+
+        ones = 0
+        for w in range(n_words):
+            x = v[w]
+            while x:
+                x &= x - np.uint64(1)
+                ones += 1
+        return n - ones
+
+
+def lcs_length(a: str, b: str) -> int:
+    """
+    Length of the longest common subsequence of a and b
+
+    Args:
+        a: First string
+        b: Second string
+
+    Returns:
+        LCS length
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0
+
+    if njit is None:
+        return _lcs_length_py(a, b)
+
+    # Map characters to dense symbol ids; characters of b not in a become -1
+    a_codes = np.frombuffer(a.encode("utf-32-le"), dtype=np.uint32)
+    b_codes = np.frombuffer(b.encode("utf-32-le"), dtype=np.uint32)
+    symbols, a_idx = np.unique(a_codes, return_inverse=True)
+    b_idx = np.searchsorted(symbols, b_codes)
+    b_idx[b_idx == len(symbols)] = 0
+    b_idx = np.where(symbols[b_idx] == b_codes, b_idx, -1)
+    return _lcs_kernel(a_idx.astype(np.int64), b_idx.astype(np.int64), len(symbols))
+
+
+def indel_ratio(a: str, b: str, score_cutoff: float = 0.0) -> float:
+    """
+    Normalized InDel similarity 2*LCS / (len(a) + len(b)), in 0-1
+
+    Same measure as rapidfuzz.fuzz.ratio / 100.
+
+    Args:
+        a: First string
+        b: Second string
+        score_cutoff: Return 0.0 without computing the LCS when the lengths
+            alone rule out reaching this score
+
+    Returns:
+        Similarity 0-1 (0.0 if below score_cutoff)
+    """
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+    # LCS can be at most the shorter length
+    if 2 * min(len(a), len(b)) < score_cutoff * total:
+        return 0.0
+    ratio = 2 * lcs_length(a, b) / total
+    return ratio if ratio >= score_cutoff else 0.0
+
+
+def partial_indel_ratio(a: str, b: str, score_cutoff: float = 0.0) -> float:
+    """
+    Best InDel similarity of the shorter string against any equally long window of the longer
+
+    Same idea as rapidfuzz.fuzz.partial_ratio / 100: a sentence quoted inside a
+    much longer chunk scores high even though the full-string ratio is low.
+
+    Args:
+        a: First string
+        b: Second string
+        score_cutoff: Return 0.0 when the best window scores below this
+
+    Returns:
+        Similarity 0-1 (0.0 if below score_cutoff)
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return 1.0 if not b else 0.0
+
+    n = len(a)
+    chars = set(a)
+    last_start = len(b) - n
+    best = 0
+    for start in range(last_start + 1):
+        # A window starting on a character absent from a does no better than the
+        # one after it, which drops that character and gains one at the end
+        if start != last_start and b[start] not in chars:
+            continue
+        lcs = lcs_length(a, b[start:start + n])
+        if lcs > best:
+            best = lcs
+            if best == n:
+                break
+
+    ratio = best / n
+    return ratio if ratio >= score_cutoff else 0.0
+
+
+_BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str) -> np.uint64:
+    """
+    64-bit SimHash of the text's character trigrams
+
+    Texts sharing most of their trigrams get signatures differing in few bits.
+    Uses Python's string hash, so signatures are only comparable within a process.
+    """
+    if len(text) < 3:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + 3] for i in range(len(text) - 2)]
+    hashes = np.array([hash(s) for s in shingles], dtype=np.int64).view(np.uint64)
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    # Bit k is set when more than half of the shingles have bit k set
+    votes = bits.sum(axis=0) * 2 > len(shingles)
+    return np.uint64((votes.astype(np.uint64) << _BIT_POSITIONS).sum())
+
+
+def min_hamming(signature: np.uint64, signatures: np.ndarray) -> int:
+    """
+    Smallest Hamming distance between a signature and an array of signatures
+
+    Args:
+        signature: 64-bit signature
+        signatures: uint64 array of signatures (non-empty)
+
+    Returns:
+        Minimum number of differing bits
+    """
+    diff = np.bitwise_xor(signatures, signature)
+    return int(np.unpackbits(diff.view(np.uint8)).reshape(-1, 64).sum(axis=1).min())
+
+
+def warmup() -> None:
+    """Compile the numba kernel ahead of the first real call"""
+    if njit is not None:
+        indel_ratio("warmup", "warm")
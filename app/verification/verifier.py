@@ -3,28 +3,235 @@ Post-Answer Verification Layer
 Validates answer grounding, consistency, and confidence
 """
 
-from typing import Dict, List, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
 import logging
-from difflib import SequenceMatcher
+import re
+import string
+import threading
+import numpy as np
+from cachetools import LRUCache, TTLCache
 
 from app.config.settings import settings
+from app.utils.fast_rank import topk_cosine
+from app.verification import _fast_sim
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = None
+    process = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# Minimum partial_ratio (0-100) for an answer sentence to count as supported by a chunk
+GROUNDING_MATCH_THRESHOLD = 60
+
+# Up to this many sentence x chunk pairs, scalar scorer calls beat cdist's thread pool setup
+SMALL_GROUNDING_PAIRS = 32
+
+# Max SimHash bit difference for an answer sentence to be accepted as a near-copy of a chunk sentence
+SIMHASH_ACCEPT_DISTANCE = 6
+
+# Sentence boundary: whitespace following terminal punctuation
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Words whose presence flips the meaning of a statement (at most 64, one bit each).
+# No cue contains another, so each negated phrase counts once.
+NEGATION_WORDS = [
+    "no ", "not ", "never ", "cannot",
+    "n't", "n\u2019t", "none ", "nothing", "neither", "nor ", "without",
+    "absent", "absence of", "lack of", "lacks ", "negative for", "free of",
+    "ruled out", "denies", "denied", "refused", "refuses", "declined", "declines",
+    "contraindicated", "contraindication", "unable to", "fails to", "failed to",
+    "avoid", "discontinue",
+]
+assert len(NEGATION_WORDS) <= 64
+
+# Bit assigned to each negation word in a negation mask
+_NEGATION_BITS = {word: 1 << i for i, word in enumerate(NEGATION_WORDS)}
+
+# Automaton matching all negation words in a single pass (when pyahocorasick is installed)
+_NEGATION_AUTOMATON = None
+if ahocorasick is not None:
+    _NEGATION_AUTOMATON = ahocorasick.Automaton()
+    for _word, _bit in _NEGATION_BITS.items():
+        _NEGATION_AUTOMATON.add_word(_word, _bit)
+    _NEGATION_AUTOMATON.make_automaton()
+
+
+def _split_sentences(text: str) -> List[str]:
+    """Split text into non-empty sentences"""
+    if not isinstance(text, str):
+        return []
+    return [s for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+
+def _text_preview(chunk: Dict) -> str:
+    """First 200 characters of a chunk's text (precomputed at ingest for newer chunks)"""
+    preview = chunk.get("text_preview")
+    if preview is None:
+        text = chunk.get("text", "")
+        preview = text[:200] if isinstance(text, str) else ""
+    return preview
+
+
+def _negation_mask(text: str, lowered: bool = False) -> int:
+    """Bitmask of the negation words present in the text (case-insensitive)"""
+    if not lowered:
+        text = text.lower()
+    mask = 0
+    if _NEGATION_AUTOMATON is not None:
+        for _, bit in _NEGATION_AUTOMATON.iter(text):
+            mask |= bit
+    else:
+        for word, bit in _NEGATION_BITS.items():
+            if word in text:
+                mask |= bit
+    return mask
+
+
+def _highlight_regex(words: List[str]) -> re.Pattern:
+    """Compile one case-insensitive whole-word pattern matching any of the words"""
+    # Longest first so a word wins over any shorter word it contains
+    words = sorted(words, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b", re.IGNORECASE)
+
+
+def _is_word_char(text: str, index: int) -> bool:
+    """Whether text[index] exists and is a regex word character"""
+    return 0 <= index < len(text) and (text[index].isalnum() or text[index] == "_")
+
+
+class VerificationCache:
+    """
+    Semantic cache of verification results
+    
+    A cached result is only reused when every check passes (fail closed):
+    query embedding cosine similarity, same query and answer negations, query
+    token-set similarity, answer character similarity, and the same set of
+    context chunk IDs.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: int = 3600,
+        similarity_threshold: float = 0.95,
+        token_threshold: float = 90
+    ):
+        """
+        Initialize verification cache
+        
+        Args:
+            maxsize: Maximum number of cached results
+            ttl: Seconds before a cached result goes stale
+            similarity_threshold: Minimum query embedding cosine similarity
+            token_threshold: Minimum query token_set_ratio and answer ratio (0-100)
+        """
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._entry_ids = itertools.count()
+        self.similarity_threshold = similarity_threshold
+        self.token_threshold = token_threshold
+    
+    def lookup(
+        self,
+        query: str,
+        query_embedding: List[float],
+        answer: str,
+        chunk_ids: frozenset
+    ) -> Optional[Dict]:
+        """Return a cached verification result matching this request, if any"""
+        entries = list(self._entries.values())
+        if not entries:
+            return None
+        
+        candidates, scores = topk_cosine(
+            query_embedding,
+            np.stack([entry["embedding"] for entry in entries]),
+            len(entries)
+        )
+        query_negations = _negation_mask(query)
+        answer_negations = _negation_mask(answer)
+        
+        for i in candidates:
+            if scores[i] < self.similarity_threshold:
+                break
+            entry = entries[i]
+            if (
+                entry["chunk_ids"] == chunk_ids
+                and entry["negations"] == query_negations
+                and entry["answer_negations"] == answer_negations
+                and fuzz.token_set_ratio(query, entry["query"]) >= self.token_threshold
+                # Full-string ratio: token_set_ratio scores 100 when one answer's
+                # tokens are a subset of the other's ("is" vs "is not")
+                and fuzz.ratio(answer, entry["answer"]) >= self.token_threshold
+            ):
+                return entry["result"]
+        return None
+    
+    def store(
+        self,
+        query: str,
+        query_embedding: List[float],
+        answer: str,
+        chunk_ids: frozenset,
+        result: Dict
+    ) -> None:
+        """Cache a verification result"""
+        self._entries[next(self._entry_ids)] = {
+            "embedding": np.asarray(query_embedding, dtype=np.float32),
+            "query": query,
+            "negations": _negation_mask(query),
+            "answer": answer,
+            "answer_negations": _negation_mask(answer),
+            "chunk_ids": chunk_ids,
+            "result": result
+        }
+
 
 class AnswerVerifier:
     """Verifies answer quality, grounding, and confidence"""
     
+    # One shared instance serves every request (see app.services.dependencies)
+    __slots__ = (
+        "confidence_threshold",
+        "verification_enabled",
+        "cache",
+        "_chunk_signatures",
+        "_chunk_signatures_lock",
+    )
+    
     def __init__(self):
         """Initialize answer verifier"""
         self.confidence_threshold = settings.confidence_threshold
         self.verification_enabled = settings.verification_enabled
+        self.cache = None
+        # The cache's token checks need rapidfuzz; without it every answer is verified
+        if settings.verification_cache_enabled and fuzz is not None:
+            self.cache = VerificationCache(
+                maxsize=settings.verification_cache_size,
+                ttl=settings.verification_cache_ttl
+            )
+        if fuzz is None:
+            _fast_sim.warmup()
+        # SimHash signatures of chunk sentences, per chunk text (chunks recur across queries)
+        self._chunk_signatures = LRUCache(maxsize=4096)
+        self._chunk_signatures_lock = threading.Lock()
     
     async def verify_answer(
         self,
         answer: str,
         context_chunks: List[Dict],
-        query: str
+        query: str,
+        query_embedding: Optional[List[float]] = None,
+        answer_embedder: Optional[Callable[[str], Awaitable[List[float]]]] = None
     ) -> Dict:
         """
         Verify answer against context and calculate confidence
@@ -33,6 +240,9 @@ class AnswerVerifier:
             answer: Generated answer
             context_chunks: Source context chunks
             query: Original query
+            query_embedding: Query embedding, enables the verification cache
+            answer_embedder: Coroutine function embedding a text; with query_embedding,
+                relevance is scored as answer/query embedding cosine
             
         Returns:
             Verification result with confidence score
@@ -41,18 +251,47 @@ class AnswerVerifier:
             if not self.verification_enabled:
                 return self._default_verification(answer, context_chunks)
             
-            # Run all verification checks
-            grounding_score = self._verify_grounding(answer, context_chunks)
-            consistency_score = self._verify_consistency(answer, context_chunks)
-            relevance_score = self._verify_relevance(answer, query)
+            use_cache = (
+                self.cache is not None
+                and query_embedding is not None
+                and isinstance(answer, str)
+                and isinstance(query, str)
+                and isinstance(context_chunks, list)
+            )
+            if use_cache:
+                chunk_ids = frozenset(
+                    c.get("chunk_id") for c in context_chunks if isinstance(c, dict)
+                )
+                cached = self.cache.lookup(query, query_embedding, answer, chunk_ids)
+                if cached is not None:
+                    logger.info("Verification cache hit")
+                    return cached
+            
+            # Lowercase chunk texts and split the answer once for all checks
+            chunk_texts_lower = self._chunk_texts_lower(context_chunks)
+            answer_sentences = _split_sentences(answer)
+            
+            if answer_embedder is not None and query_embedding is not None:
+                relevance_check = self._verify_relevance_embedding(answer, query, query_embedding, answer_embedder)
+            else:
+                relevance_check = asyncio.to_thread(self._verify_relevance, answer, query)
+            
+            # Run all verification checks concurrently, off the event loop
+            grounding_score, consistency_score, relevance_score = await asyncio.gather(
+                asyncio.to_thread(
+                    self._verify_grounding, answer, context_chunks, chunk_texts_lower, answer_sentences
+                ),
+                asyncio.to_thread(self._verify_consistency, answer, context_chunks, chunk_texts_lower),
+                relevance_check
+            )
             
             # Calculate overall confidence
             overall_confidence = (grounding_score + consistency_score + relevance_score) / 3
             
             # Extract evidence
-            evidence = self._extract_evidence(answer, context_chunks)
+            evidence = self._extract_evidence(answer, context_chunks, answer_sentences)
             
-            return {
+            result = {
                 "verified": True,
                 "confidence_score": overall_confidence,
                 "meets_threshold": overall_confidence >= self.confidence_threshold,
@@ -67,6 +306,11 @@ class AnswerVerifier:
                 }
             }
             
+            if use_cache:
+                self.cache.store(query, query_embedding, answer, chunk_ids, result)
+            
+            return result
+            
         except Exception as e:
             logger.error(f"Error in verification: {str(e)}")
             return {
@@ -75,7 +319,23 @@ class AnswerVerifier:
                 "confidence_score": 0
             }
     
-    def _verify_grounding(self, answer: str, chunks: List[Dict]) -> float:
+    def _chunk_texts_lower(self, chunks: List[Dict]) -> List[str]:
+        """Lowercased text of each dict chunk with string text"""
+        if not chunks or not isinstance(chunks, list):
+            return []
+        return [
+            c.get("text", "").lower()
+            for c in chunks
+            if isinstance(c, dict) and isinstance(c.get("text", ""), str)
+        ]
+    
+    def _verify_grounding(
+        self,
+        answer: str,
+        chunks: List[Dict],
+        chunk_texts_lower: Optional[List[str]] = None,
+        answer_sentences: Optional[List[str]] = None
+    ) -> float:
         """
         Verify that answer is grounded in provided context
         
@@ -92,26 +352,57 @@ class AnswerVerifier:
                 return 0.0
             
             # Check how much of answer is supported by context
-            answer_sentences = answer.split(". ") if isinstance(answer, str) else [""]
-            answer_sentences = [s for s in answer_sentences if s.strip()]
-            supported_sentences = 0
-            
-            for sentence in answer_sentences:
-                for chunk in valid_chunks:
-                    chunk_text = chunk.get("text", "")
-                    if not isinstance(chunk_text, str):
-                        continue
-                    
-                    chunk_text = chunk_text.lower()
-                    sentence_lower = sentence.lower()
-                    
-                    # Check if key parts of sentence appear in chunks
-                    if self._sentence_similarity(sentence_lower, chunk_text) > 0.6:
-                        supported_sentences += 1
-                        break
+            if answer_sentences is None:
+                answer_sentences = _split_sentences(answer)
+            sentence_list = [s.lower() for s in answer_sentences]
+            if chunk_texts_lower is None:
+                chunk_texts_lower = self._chunk_texts_lower(valid_chunks)
+            chunk_list = chunk_texts_lower
             
-            if answer_sentences:
-                grounding_score = min(1.0, supported_sentences / len(answer_sentences))
+            if sentence_list and chunk_list:
+                # Near-copies of a chunk sentence are accepted from their SimHash signatures alone
+                # (a whole-chunk signature is too far from any one sentence to ever match)
+                chunk_signatures = np.concatenate(
+                    [self._chunk_signatures_for(chunk) for chunk in chunk_list]
+                )
+                remaining = [
+                    sentence for sentence in sentence_list
+                    if _fast_sim.min_hamming(_fast_sim.simhash(sentence), chunk_signatures) > SIMHASH_ACCEPT_DISTANCE
+                ]
+                supported_sentences = len(sentence_list) - len(remaining)
+                
+                if remaining and process is None:
+                    # No rapidfuzz: same best-window measure as partial_ratio, from the InDel kernel
+                    threshold = GROUNDING_MATCH_THRESHOLD / 100
+                    supported_sentences += sum(
+                        1 for sentence in remaining
+                        if any(
+                            _fast_sim.partial_indel_ratio(sentence, chunk, score_cutoff=threshold)
+                            for chunk in chunk_list
+                        )
+                    )
+                elif remaining and len(remaining) * len(chunk_list) <= SMALL_GROUNDING_PAIRS:
+                    # Typical small answers: scalar scorer, stopping at the first supporting chunk
+                    supported_sentences += sum(
+                        1 for sentence in remaining
+                        if any(
+                            fuzz.partial_ratio(sentence, chunk, score_cutoff=GROUNDING_MATCH_THRESHOLD)
+                            for chunk in chunk_list
+                        )
+                    )
+                elif remaining:
+                    # Sentence x chunk score matrix, computed in parallel by RapidFuzz
+                    scores = process.cdist(
+                        remaining,
+                        chunk_list,
+                        scorer=fuzz.partial_ratio,
+                        score_cutoff=GROUNDING_MATCH_THRESHOLD,
+                        dtype=np.uint8,
+                        workers=-1
+                    )
+                    supported_sentences += int((scores.max(axis=1) >= GROUNDING_MATCH_THRESHOLD).sum())
+                
+                grounding_score = min(1.0, supported_sentences / len(sentence_list))
             else:
                 grounding_score = 0.0
             
@@ -122,7 +413,24 @@ class AnswerVerifier:
             logger.error(f"Error in grounding verification: {str(e)}", exc_info=True)
             return 0.5
     
-    def _verify_consistency(self, answer: str, chunks: List[Dict]) -> float:
+    def _chunk_signatures_for(self, chunk_text: str) -> np.ndarray:
+        """SimHash signatures of the sentences of a (lowercased) chunk text, cached across calls"""
+        # Checks run in worker threads, so cache access is locked
+        with self._chunk_signatures_lock:
+            signatures = self._chunk_signatures.get(chunk_text)
+        if signatures is None:
+            sentences = _split_sentences(chunk_text) or [chunk_text]
+            signatures = np.array([_fast_sim.simhash(s) for s in sentences], dtype=np.uint64)
+            with self._chunk_signatures_lock:
+                self._chunk_signatures[chunk_text] = signatures
+        return signatures
+    
+    def _verify_consistency(
+        self,
+        answer: str,
+        chunks: List[Dict],
+        chunk_texts_lower: Optional[List[str]] = None
+    ) -> float:
         """
         Verify consistency with source material
         
@@ -133,22 +441,16 @@ class AnswerVerifier:
             if not chunks or not isinstance(chunks, list):
                 return 0.5
             
-            # Filter valid chunks and extract text
-            valid_chunks = [c for c in chunks if isinstance(c, dict)]
-            context_parts = []
-            
-            for chunk in valid_chunks:
-                text = chunk.get("text", "")
-                if isinstance(text, str) and text.strip():
-                    context_parts.append(text)
+            # Extract non-empty chunk texts (lowercased; only used for matching)
+            if chunk_texts_lower is None:
+                chunk_texts_lower = self._chunk_texts_lower(chunks)
+            context_parts = [text for text in chunk_texts_lower if text.strip()]
             
             if not context_parts:
                 return 0.5
             
-            context_text = " ".join(context_parts)
-            
             # Check for contradictions
-            contradictions = self._find_contradictions(answer, context_text)
+            contradictions = self._find_contradictions(answer, context_parts, context_lowered=True)
             
             # Score based on absence of contradictions
             consistency_score = 1.0 - min(1.0, len(contradictions) * 0.2)
@@ -160,6 +462,33 @@ class AnswerVerifier:
             logger.error(f"Error in consistency verification: {str(e)}", exc_info=True)
             return 0.5
     
+    async def _verify_relevance_embedding(
+        self,
+        answer: str,
+        query: str,
+        query_embedding: List[float],
+        answer_embedder: Callable[[str], Awaitable[List[float]]]
+    ) -> float:
+        """
+        Verify answer relevance as cosine similarity of answer and query embeddings
+        
+        Falls back to string similarity if the answer cannot be embedded.
+        
+        Returns:
+            Confidence score 0-1
+        """
+        try:
+            answer_embedding = await answer_embedder(answer) if isinstance(answer, str) else None
+            if answer_embedding is not None and len(answer_embedding) == len(query_embedding):
+                _, scores = topk_cosine(query_embedding, np.asarray(answer_embedding)[None, :], 1)
+                relevance = min(max(float(scores[0]), 0.0), 1.0)
+                logger.info(f"Relevance score: {relevance:.2f}")
+                return relevance
+        except Exception as e:
+            logger.warning(f"Answer embedding failed, using string relevance: {str(e)}")
+        
+        return await asyncio.to_thread(self._verify_relevance, answer, query)
+    
     def _verify_relevance(self, answer: str, query: str) -> float:
         """
         Verify answer relevance to query
@@ -189,29 +518,55 @@ class AnswerVerifier:
         s1 = s1.lower().strip()
         s2 = s2.lower().strip()
         
-        matcher = SequenceMatcher(None, s1, s2)
-        return matcher.ratio()
+        # Normalized InDel similarity (same 2*M/T form as difflib's ratio), 0-100
+        if fuzz is None:
+            return _fast_sim.indel_ratio(s1, s2)
+        return fuzz.ratio(s1, s2) / 100.0
     
-    def _find_contradictions(self, answer: str, context: str) -> List[str]:
-        """Find potential contradictions between answer and context"""
+    def _find_contradictions(
+        self,
+        answer: str,
+        context_parts: List[str],
+        context_lowered: bool = False
+    ) -> List[str]:
+        """Find potential contradictions between answer and context (given as separate texts)"""
         contradictions = []
         
-        # Ensure both are strings
+        # Ensure answer is a string
         if not isinstance(answer, str):
             answer = str(answer) if answer else ""
-        if not isinstance(context, str):
-            context = str(context) if context else ""
         
-        # Check for explicit negations
-        negation_words = ["no ", "not ", "never ", "cannot"]
+        # Check for explicit negations; context texts are scanned one by one rather than
+        # joined, treating all but the last as followed by a space like the joined text
+        answer_mask = _negation_mask(answer)
+        context_mask = 0
+        last = len(context_parts) - 1
+        for i, part in enumerate(context_parts):
+            if not isinstance(part, str):
+                continue
+            if not context_lowered:
+                part = part.lower()
+            context_mask |= _negation_mask(part, lowered=True)
+            if i < last:
+                for word, bit in _NEGATION_BITS.items():
+                    if word.endswith(" ") and part.endswith(word[:-1]):
+                        context_mask |= bit
         
-        for word in negation_words:
-            if word in answer.lower() and word not in context.lower():
-                contradictions.append(f"Possible contradiction: '{word}' in answer not in context")
+        # Negation words in the answer but nowhere in the context
+        missing = answer_mask & ~context_mask
+        if missing:
+            for word, bit in _NEGATION_BITS.items():
+                if missing & bit:
+                    contradictions.append(f"Possible contradiction: '{word}' in answer not in context")
         
         return contradictions
     
-    def _extract_evidence(self, answer: str, chunks: List[Dict]) -> List[Dict]:
+    def _extract_evidence(
+        self,
+        answer: str,
+        chunks: List[Dict],
+        answer_sentences: Optional[List[str]] = None
+    ) -> List[Dict]:
         """Extract specific evidence from chunks supporting the answer"""
         evidence = []
         
@@ -221,17 +576,19 @@ class AnswerVerifier:
         # Filter valid chunks
         valid_chunks = [c for c in chunks if isinstance(c, dict)]
         
-        answer_sentences = answer.split(". ") if isinstance(answer, str) else []
+        if answer_sentences is None:
+            answer_sentences = _split_sentences(answer)
+        highlighter = self._highlighter(answer_sentences)
         
         for chunk in valid_chunks[:3]:  # Top 3 chunks as evidence
             try:
                 evidence.append({
                     "page_number": chunk.get("page_number"),
                     "document": chunk.get("source_document"),
-                    "exact_chunk": chunk.get("text", "")[:200] if isinstance(chunk.get("text", ""), str) else "",
+                    "exact_chunk": _text_preview(chunk),
                     "bbox": chunk.get("bbox"),
                     "chunk_id": chunk.get("chunk_id"),
-                    "highlighted": self._highlight_evidence(chunk.get("text", ""), answer_sentences)
+                    "highlighted": self._highlight_evidence(chunk.get("text", ""), highlighter)
                 })
             except Exception as e:
                 logger.debug(f"Error extracting evidence from chunk: {e}")
@@ -239,23 +596,72 @@ class AnswerVerifier:
         
         return evidence
     
-    def _highlight_evidence(self, chunk_text: str, answer_sentences: List[str]) -> str:
+    def _highlighter(self, answer_sentences: List[str]):
+        """
+        Build one case-insensitive matcher for the answer's longer words
+        
+        Returns:
+            Aho-Corasick automaton over the lowercased words when pyahocorasick
+            is installed, a compiled regex otherwise, or None if there are no words
+        """
+        words = {
+            word.strip(string.punctuation)
+            for sentence in answer_sentences
+            if isinstance(sentence, str)
+            for word in sentence.split()
+        }
+        words = [word for word in words if len(word) > 4]
+        if not words:
+            return None
+        
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for word in words:
+                lowered = word.lower()
+                automaton.add_word(lowered, (len(lowered), word))
+            automaton.make_automaton()
+            return automaton
+        
+        return _highlight_regex(words)
+    
+    def _highlight_evidence(self, chunk_text: str, highlighter) -> str:
         """Highlight matching text in chunk"""
         if not isinstance(chunk_text, str):
             chunk_text = str(chunk_text) if chunk_text else ""
         
-        highlighted = chunk_text
+        if highlighter is None:
+            return chunk_text
         
-        for sentence in answer_sentences:
-            if not isinstance(sentence, str):
+        if isinstance(highlighter, re.Pattern):
+            return highlighter.sub(lambda match: f"**{match.group(0)}**", chunk_text)
+        
+        lowered = chunk_text.lower()
+        if len(lowered) != len(chunk_text):
+            # Lowercasing changed offsets (rare non-ASCII cases), match on the original text
+            words = [word for _, word in highlighter.values()]
+            return self._highlight_evidence(chunk_text, _highlight_regex(words))
+        
+        # One automaton pass finds every occurrence; keep whole-word hits,
+        # leftmost first and longest first at the same start, without overlaps
+        hits = []
+        for end, (length, _) in highlighter.iter(lowered):
+            start = end - length + 1
+            if _is_word_char(chunk_text, start - 1) or _is_word_char(chunk_text, end + 1):
                 continue
-            
-            words = sentence.split()
-            for word in words:
-                if len(word) > 4 and word.lower() in chunk_text.lower():
-                    highlighted = highlighted.replace(word, f"**{word}**")
+            hits.append((start, -length))
+        hits.sort()
         
-        return highlighted
+        segments = []
+        position = 0
+        for start, neg_length in hits:
+            if start < position:
+                continue
+            end = start - neg_length
+            segments.append(chunk_text[position:start])
+            segments.append(f"**{chunk_text[start:end]}**")
+            position = end
+        segments.append(chunk_text[position:])
+        return "".join(segments)
     
     def _default_verification(self, answer: str, chunks: List[Dict]) -> Dict:
         """Default verification when verification is disabled"""
@@ -267,7 +673,7 @@ class AnswerVerifier:
                 {
                     "page_number": c.get("page_number"),
                     "document": c.get("source_document"),
-                    "exact_chunk": c.get("text", "")[:200] if isinstance(c.get("text", ""), str) else ""
+                    "exact_chunk": _text_preview(c)
                 }
                 for c in valid_chunks[:3]
             ]
@@ -5,15 +5,16 @@ Multi-layer RAG system for medical document processing and intelligent retrieval
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
-from pathlib import Path
 import os
 import sys
 
 from app.config.settings import settings
 from app.api.routes import router
 from app.utils.helpers import setup_logging
+from app.services.dependencies import init_services
 
 # Initialize logger
 logger = setup_logging(__name__)
@@ -28,30 +29,26 @@ async def lifespan(app: FastAPI):
     logger.info(f"Vector DB: {settings.vector_db_type}")
     
     # Configure Tesseract path at startup
-    if settings.tesseract_path:
-        tesseract_path = settings.tesseract_path
-        tesseract_dir = str(Path(tesseract_path).parent)
+    tesseract = settings.resolved_tesseract
+    if tesseract:
+        logger.info(f"[OCR] Configuring Tesseract path: {tesseract.path}")
         
-        logger.info(f"[OCR] Configuring Tesseract path: {tesseract_path}")
-        
-        # Add to system PATH
-        if tesseract_dir not in os.environ.get('PATH', ''):
-            os.environ['PATH'] = tesseract_dir + os.pathsep + os.environ.get('PATH', '')
-            logger.info(f"[OCR] Added to Windows PATH: {tesseract_dir}")
+        # Add to system PATH (once per process)
+        path_entries = os.environ.get('PATH', '').split(os.pathsep)
+        if tesseract.parent not in path_entries:
+            os.environ['PATH'] = tesseract.parent + os.pathsep + os.environ.get('PATH', '')
+            logger.info(f"[OCR] Added to PATH: {tesseract.parent}")
         
         # Also set pytesseract_cmd
         import pytesseract
-        pytesseract.pytesseract.pytesseract_cmd = tesseract_path
-        logger.info(f"[OCR] Set pytesseract_cmd: {tesseract_path}")
-        
-        # Verify the path exists
-        if Path(tesseract_path).exists():
-            logger.info(f"[OCR] ✅ Tesseract found at: {tesseract_path}")
-        else:
-            logger.error(f"[OCR] ❌ Tesseract not found at: {tesseract_path}")
+        pytesseract.pytesseract.pytesseract_cmd = tesseract.path
+        logger.info(f"[OCR] Set pytesseract_cmd: {tesseract.path}")
     else:
         logger.warning("[OCR] No tesseract_path configured in settings")
     
+    # Load models and create clients once, before serving requests
+    init_services()
+    
     yield
     logger.info("FastAPI RAG Application shutting down...")
 
@@ -61,20 +58,24 @@ app = FastAPI(
     title="ClinicTech RAG API",
     description="Multi-layer Retrieval-Augmented Generation system for medical documents",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 
 # Configure CORS
+# A frozenset makes Starlette's per-request origin check a set lookup; no "*" so
+# credentialed requests are only accepted from these origins
+CORS_ALLOWED_ORIGINS = frozenset({
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+})
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "*"
-    ],
+    allow_origins=CORS_ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -1,58 +1,76 @@
 #!/usr/bin/env python3
 """Quick test of OpenAI embedding service"""
 
+import base64
+import logging
 import sys
 import os
 
+import numpy as np
+
 # Add project to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-print("🔍 Testing OpenAI Embedding Service")
-print("=" * 60)
+from app.utils.script_logging import setup_script_logging
+
+setup_script_logging()
+logger = logging.getLogger(__name__)
+
+logger.info("🔍 Testing OpenAI Embedding Service")
+logger.info("=" * 60)
 
 try:
-    print("1️⃣  Loading settings...")
+    logger.info("1️⃣  Loading settings...")
     from app.config.settings import settings
-    print(f"   ✅ LLM Model: {settings.llm_model}")
-    print(f"   ✅ Embedding Model: {settings.embedding_model}")
-    print(f"   ✅ API Key Present: {'Yes' if settings.llm_api_key else 'No'}")
+    logger.info(f"   ✅ LLM Model: {settings.llm_model}")
+    logger.info(f"   ✅ Embedding Model: {settings.embedding_model}")
+    logger.info(f"   ✅ API Key Present: {'Yes' if settings.llm_api_key else 'No'}")
     
-    print("\n2️⃣  Testing OpenAI Client...")
+    logger.info("\n2️⃣  Testing OpenAI Client...")
+    import importlib.util
+    import httpx
     from openai import OpenAI
-    client = OpenAI(api_key=settings.llm_api_key)
-    print(f"   ✅ OpenAI client created")
-    
-    print("\n3️⃣  Testing single embedding...")
-    response = client.embeddings.create(
-        input="test query",
-        model="text-embedding-3-small"
+    # Keep-alive connection pool; HTTP/2 only when the optional h2 package is installed
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=30),
+        http2=importlib.util.find_spec("h2") is not None
     )
-    embedding = response.data[0].embedding
-    print(f"   ✅ Embedding generated")
-    print(f"   ✅ Dimension: {len(embedding)} (expected 1536)")
+    client = OpenAI(api_key=settings.llm_api_key, http_client=http_client)
+    logger.info(f"   ✅ OpenAI client created")
     
-    print("\n4️⃣  Testing batch embeddings...")
+    # Single and batch embeddings come from one request (one round trip)
+    # base64 transfers raw float32 bytes instead of JSON floats
     response = client.embeddings.create(
-        input=["text 1", "text 2", "text 3"],
-        model="text-embedding-3-small"
+        input=["test query", "text 1", "text 2", "text 3"],
+        model="text-embedding-3-small",
+        encoding_format="base64"
     )
-    embeddings = [data.embedding for data in response.data]
-    print(f"   ✅ Batch embedding generated")
-    print(f"   ✅ Count: {len(embeddings)}")
-    print(f"   ✅ Dimension: {len(embeddings[0])}")
+    all_embeddings = np.stack([
+        np.frombuffer(base64.b64decode(data.embedding), dtype=np.float32)
+        for data in response.data
+    ])
+    
+    logger.info("\n3️⃣  Testing single embedding...")
+    embedding = all_embeddings[0]
+    logger.info(f"   ✅ Embedding generated")
+    logger.info(f"   ✅ Dimension: {len(embedding)} (expected 1536)")
+    
+    logger.info("\n4️⃣  Testing batch embeddings...")
+    embeddings = all_embeddings[1:]
+    logger.info(f"   ✅ Batch embedding generated")
+    logger.info(f"   ✅ Count: {len(embeddings)}")
+    logger.info(f"   ✅ Dimension: {len(embeddings[0])}")
     
-    print("\n5️⃣  Testing ChromaDB...")
+    logger.info("\n5️⃣  Testing ChromaDB...")
     import chromadb
     client_chroma = chromadb.Client()
     collection = client_chroma.get_or_create_collection(name="test")
-    print(f"   ✅ ChromaDB client created")
+    logger.info(f"   ✅ ChromaDB client created")
     
-    print("\n" + "=" * 60)
-    print("✅ ALL TESTS PASSED - Ready for production!")
-    print("=" * 60)
+    logger.info("\n" + "=" * 60)
+    logger.info("✅ ALL TESTS PASSED - Ready for production!")
+    logger.info("=" * 60)
     
 except Exception as e:
-    print(f"\n❌ ERROR: {str(e)}")
-    import traceback
-    traceback.print_exc()
+    logger.error(f"\n❌ ERROR: {str(e)}", exc_info=True)
     sys.exit(1)
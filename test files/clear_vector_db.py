@@ -5,12 +5,19 @@ Removes all stored vectors and resets ChromaDB
 
 import logging
 import shutil
+import threading
+import uuid
 from pathlib import Path
 from app.config.settings import settings
+from app.utils.script_logging import setup_script_logging
 
-logging.basicConfig(level=logging.INFO)
+setup_script_logging()
 logger = logging.getLogger(__name__)
 
+def _log_delete_error(function, path, exc_info):
+    """rmtree error handler: log and keep deleting the rest"""
+    logger.warning(f"Could not delete {path}: {exc_info[1]}")
+
 def clear_vector_db():
     """Clear the vector database completely"""
     try:
@@ -23,8 +30,16 @@ def clear_vector_db():
         if db_path.exists():
             logger.info(f"Found vector DB directory at: {db_path}")
             logger.info("Removing entire directory...")
-            shutil.rmtree(db_path)
-            logger.info(f"✅ Deleted vector DB directory: {db_path}")
+            # Renaming is instant; the old tree is then deleted in a background thread
+            trash_path = db_path.with_name(f"{db_path.name}.delete-{uuid.uuid4().hex}")
+            db_path.rename(trash_path)
+            threading.Thread(
+                target=shutil.rmtree,
+                args=(trash_path,),
+                kwargs={"onerror": _log_delete_error},
+                name="clear-vector-db"
+            ).start()
+            logger.info(f"✅ Moved vector DB directory aside for deletion: {trash_path}")
         else:
             logger.warning(f"Vector DB directory not found at: {db_path}")
         
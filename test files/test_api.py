@@ -3,45 +3,67 @@ Simple API test script
 """
 
 import asyncio
+import importlib.util
 import json
+import logging
+import os
+import sys
 import httpx
 
-async def test_health():
+# Repo root on the path so the app package imports when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.script_logging import setup_script_logging
+
+setup_script_logging()
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+async def test_health(client: httpx.AsyncClient):
     """Test health endpoint"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.get("http://localhost:8000/health")
-            print("=== HEALTH CHECK ===")
-            print(f"Status: {response.status_code}")
-            print(f"Response: {response.json()}")
-            print()
-        except Exception as e:
-            print(f"Health check failed: {e}")
-            print()
-
-async def test_query():
+    try:
+        response = await client.get("http://localhost:8000/health")
+        logger.info("=== HEALTH CHECK ===")
+        logger.info(f"Status: {response.status_code}")
+        logger.info(f"Response: {response.json()}")
+        logger.info("")
+    except Exception as e:
+        logger.error(f"Health check failed: {e}")
+        logger.info("")
+
+async def test_query(client: httpx.AsyncClient):
     """Test query endpoint"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            payload = {"query": "What is the clinical finding?"}
-            response = await client.post(
-                "http://localhost:8000/query",
-                json=payload
-            )
-            print("=== QUERY TEST ===")
-            print(f"Status: {response.status_code}")
-            result = response.json()
-            print(f"Response: {json.dumps(result, indent=2)}")
-            print()
-        except Exception as e:
-            print(f"Query test failed: {e}")
-            print()
+    try:
+        payload = {"query": "What is the clinical finding?"}
+        response = await client.post(
+            "http://localhost:8000/query",
+            json=payload
+        )
+        logger.info("=== QUERY TEST ===")
+        logger.info(f"Status: {response.status_code}")
+        result = response.json()
+        logger.info(f"Response: {json.dumps(result, indent=2)}")
+        logger.info("")
+    except Exception as e:
+        logger.error(f"Query test failed: {e}")
+        logger.info("")
 
 async def main():
-    print("Testing ClinicTech AI API")
-    print("=" * 50)
-    await test_health()
-    await test_query()
+    logger.info("Testing ClinicTech AI API")
+    logger.info("=" * 50)
+    # One pooled client for all requests, so connections are kept alive and reused
+    client = httpx.AsyncClient(
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        http2=HTTP2_AVAILABLE
+    )
+    try:
+        # The probes are independent, so run them concurrently
+        await asyncio.gather(test_health(client), test_query(client))
+    finally:
+        await client.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
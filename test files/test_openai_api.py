@@ -1,26 +1,33 @@
 #!/usr/bin/env python3
 """Test OpenAI API v1.0.0+ compatibility"""
 
+import logging
 import sys
 import os
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Repo root on the path so the app package imports when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("🔍 Testing OpenAI API v1.0.0+ Compatibility")
-print("=" * 60)
+from app.utils.script_logging import setup_script_logging
+
+setup_script_logging()
+logger = logging.getLogger(__name__)
+
+logger.info("🔍 Testing OpenAI API v1.0.0+ Compatibility")
+logger.info("=" * 60)
 
 try:
-    print("1️⃣  Loading settings...")
+    logger.info("1️⃣  Loading settings...")
     from app.config.settings import settings
-    print(f"   ✅ LLM Provider: {settings.llm_provider}")
-    print(f"   ✅ LLM Model: {settings.llm_model}")
+    logger.info(f"   ✅ LLM Provider: {settings.llm_provider}")
+    logger.info(f"   ✅ LLM Model: {settings.llm_model}")
     
-    print("\n2️⃣  Testing OpenAI Client (v1.0.0+)...")
+    logger.info("\n2️⃣  Testing OpenAI Client (v1.0.0+)...")
     from openai import OpenAI
     client = OpenAI(api_key=settings.llm_api_key)
-    print(f"   ✅ OpenAI client created with new API")
+    logger.info(f"   ✅ OpenAI client created with new API")
     
-    print("\n3️⃣  Testing chat.completions.create() method...")
+    logger.info("\n3️⃣  Testing chat.completions.create() method...")
     response = client.chat.completions.create(
         model="gpt-4",
         messages=[
@@ -30,28 +37,26 @@ try:
         temperature=0.1,
         max_tokens=50
     )
-    print(f"   ✅ API call successful!")
-    print(f"   ✅ Response: {response.choices[0].message.content}")
-    print(f"   ✅ Tokens used: {response.usage.total_tokens}")
+    logger.info(f"   ✅ API call successful!")
+    logger.info(f"   ✅ Response: {response.choices[0].message.content}")
+    logger.info(f"   ✅ Tokens used: {response.usage.total_tokens}")
     
-    print("\n4️⃣  Testing LLM Service...")
+    logger.info("\n4️⃣  Testing LLM Service...")
     from app.llm.llm_service import LLMService
     llm_service = LLMService()
     
     if llm_service.client:
-        print(f"   ✅ LLM Service initialized")
-        print(f"      - Provider: {llm_service.provider}")
-        print(f"      - Model: {llm_service.model}")
-        print(f"      - Temperature: {llm_service.temperature}")
+        logger.info(f"   ✅ LLM Service initialized")
+        logger.info(f"      - Provider: {llm_service.provider}")
+        logger.info(f"      - Model: {llm_service.model}")
+        logger.info(f"      - Temperature: {llm_service.temperature}")
     else:
-        print(f"   ❌ LLM Service client not initialized")
+        logger.info(f"   ❌ LLM Service client not initialized")
     
-    print("\n" + "=" * 60)
-    print("✅ ALL TESTS PASSED - OpenAI v1.0.0+ Compatible!")
-    print("=" * 60)
+    logger.info("\n" + "=" * 60)
+    logger.info("✅ ALL TESTS PASSED - OpenAI v1.0.0+ Compatible!")
+    logger.info("=" * 60)
     
 except Exception as e:
-    print(f"\n❌ ERROR: {str(e)}")
-    import traceback
-    traceback.print_exc()
+    logger.error(f"\n❌ ERROR: {str(e)}", exc_info=True)
     sys.exit(1)
@@ -3,14 +3,36 @@
 Verify the setup and configuration for the RAG application
 """
 
+import os
 import sys
+import argparse
 import logging
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Repo root on the path so the app package imports when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.script_logging import setup_script_logging
+
+setup_script_logging('%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def verify_environment():
-    """Verify environment configuration"""
+def _is_installed(package):
+    """Whether a package can be imported, without running its import"""
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        return False
+
+def verify_environment(deep=False):
+    """
+    Verify environment configuration
+    
+    Args:
+        deep: Also initialize the embedding, vector store and LLM services
+            (opens API clients and the vector DB); otherwise stop after the config check
+    """
     logger.info("=" * 60)
     logger.info("🔍 VERIFYING RAG APPLICATION SETUP")
     logger.info("=" * 60)
@@ -26,11 +48,15 @@ def verify_environment():
         'sentence_transformers'
     ]
     
-    for package in required_packages:
-        try:
-            __import__(package)
+    # Only locate the packages (importing chromadb, torch etc. takes seconds);
+    # the lookups are filesystem I/O, so run them concurrently
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda p: (p, _is_installed(p)), required_packages))
+    
+    for package, installed in results:
+        if installed:
             logger.info(f"   ✅ {package}")
-        except ImportError:
+        else:
             logger.warning(f"   ⚠️  {package} not found")
     
     # 3. Check configuration
@@ -54,6 +80,12 @@ def verify_environment():
     except Exception as e:
         logger.error(f"   ❌ Error loading config: {str(e)}")
     
+    if not deep:
+        logger.info("=" * 60)
+        logger.info("✅ VERIFICATION COMPLETE (run with --deep to check services)")
+        logger.info("=" * 60)
+        return
+    
     # 4. Check embedding service
     logger.info("4️⃣  Checking embedding service...")
     try:
@@ -104,4 +136,11 @@ def verify_environment():
     logger.info("=" * 60)
 
 if __name__ == "__main__":
-    verify_environment()
+    parser = argparse.ArgumentParser(description="Verify RAG application setup")
+    parser.add_argument(
+        "--deep",
+        action="store_true",
+        help="also initialize the embedding, vector store and LLM services"
+    )
+    args = parser.parse_args()
+    verify_environment(deep=args.deep)